@@ -0,0 +1,144 @@
+# compares the /species/{id}/sites query against the join + group by it replaced.
+#
+#   python -m benchmarks.sites_by_species                 # database from .env
+#   python -m benchmarks.sites_by_species --synthetic 1000000
+#
+# --synthetic builds an in-memory sqlite copy of the schema (same indexes) with
+# that many surveys spread over ~15k sites and 100 species, skewed so a few
+# species turn up everywhere, which is the case the group by handled worst
+import argparse
+import random
+import statistics
+import time
+import uuid
+
+from dotenv import dotenv_values
+from sqlalchemy import Engine, Select, create_engine, insert, select, text
+
+from src.fish.db.engine import build_conn_string
+from src.fish.db.models import Base, DBSites, DBSpecies, DBSurvey
+from src.fish.operations.species import retrieve_area_by_species_query_builder
+
+SITE_COUNT = 15_000
+SPECIES_COUNT = 100
+INSERT_BATCH = 50_000
+
+
+def group_by_query_builder(id: int) -> Select:
+    # the previous implementation, kept here only to compare against
+    return (
+        select(
+            DBSites.id,
+            DBSites.top_tier_site,
+            DBSites.site_parent_name,
+            DBSites.site_name,
+        )
+        .join(DBSurvey, onclause=DBSites.id == DBSurvey.area_id)
+        .join(DBSpecies, onclause=DBSurvey.species_id == DBSpecies.id)
+        .filter(DBSpecies.id == id)
+        .group_by(
+            DBSites.id,
+            DBSites.top_tier_site,
+            DBSites.site_parent_name,
+            DBSites.site_name,
+        )
+    )
+
+
+def populate_synthetic(engine: Engine, survey_count: int):
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(0)
+    site_ids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(SITE_COUNT)]
+    weights = [1 / rank for rank in range(1, SPECIES_COUNT + 1)]
+    with engine.begin() as conn:
+        conn.execute(
+            insert(DBSpecies),
+            [
+                {"id": id, "species_name": f"species {id}"}
+                for id in range(1, SPECIES_COUNT + 1)
+            ],
+        )
+        conn.execute(
+            insert(DBSites),
+            [
+                {
+                    "id": id,
+                    "top_tier_site": "top tier",
+                    "site_parent_name": "parent",
+                    "site_name": f"site {n}",
+                }
+                for n, id in enumerate(site_ids)
+            ],
+        )
+        for start in range(0, survey_count, INSERT_BATCH):
+            size = min(INSERT_BATCH, survey_count - start)
+            species = rng.choices(range(1, SPECIES_COUNT + 1), weights, k=size)
+            conn.execute(
+                insert(DBSurvey),
+                [
+                    {
+                        "id": uuid.UUID(int=rng.getrandbits(128)),
+                        "survey_id": start + n,
+                        "event_date_year": rng.randint(1980, 2023),
+                        "species_id": species_id,
+                        "area_id": rng.choice(site_ids),
+                        "fish_count": rng.randint(1, 50),
+                    }
+                    for n, species_id in enumerate(species)
+                ],
+            )
+        conn.execute(text("ANALYZE"))
+
+
+def explain(engine: Engine, statement: Select) -> str:
+    compiled = statement.compile(
+        dialect=engine.dialect, compile_kwargs={"literal_binds": True}
+    )
+    if engine.dialect.name == "postgresql":
+        prefix = "EXPLAIN (ANALYZE, BUFFERS)"
+    else:
+        prefix = "EXPLAIN QUERY PLAN"
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"{prefix} {compiled}")).all()
+    return "\n".join(str(row[-1]) for row in rows)
+
+
+def time_statement(engine: Engine, statement: Select, repeat: int) -> list:
+    timings = []
+    with engine.connect() as conn:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = conn.execute(statement).all()
+            timings.append(time.perf_counter() - start)
+    return rows, timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--synthetic", type=int, help="surveys to generate in sqlite")
+    parser.add_argument("--species-id", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        engine = create_engine("sqlite://")
+        populate_synthetic(engine, args.synthetic)
+    else:
+        engine = create_engine(build_conn_string(dotenv_values(".env")))
+
+    for name, builder in (
+        ("group by", group_by_query_builder),
+        ("exists", retrieve_area_by_species_query_builder),
+    ):
+        statement = builder(args.species_id)
+        rows, timings = time_statement(engine, statement, args.repeat)
+        print(f"== {name}: {len(rows)} sites")
+        print(
+            f"median {statistics.median(timings) * 1000:.1f} ms, "
+            f"min {min(timings) * 1000:.1f} ms over {args.repeat} runs"
+        )
+        print(explain(engine, statement))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""index fish_survey for the site/species joins and year group-bys
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+"""
+
+from alembic import op
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # built concurrently so a seasonal reload isn't blocked behind the lock
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_fish_survey_area_id_species_id",
+            "fish_survey",
+            ["area_id", "species_id"],
+            postgresql_include=["event_date_year", "fish_count"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_fish_survey_species_id_area_id",
+            "fish_survey",
+            ["species_id", "area_id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_fish_survey_event_date_year",
+            "fish_survey",
+            ["event_date_year"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+    op.execute("ANALYZE fish_survey")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name in (
+            "ix_fish_survey_event_date_year",
+            "ix_fish_survey_species_id_area_id",
+            "ix_fish_survey_area_id_species_id",
+        ):
+            op.drop_index(
+                name,
+                table_name="fish_survey",
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
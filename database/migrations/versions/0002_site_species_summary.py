@@ -0,0 +1,80 @@
+"""precomputed per-site species summary, kept current by an insert trigger
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "fish_site_species_summary",
+        sa.Column("area_id", sa.String(), primary_key=True),
+        sa.Column("species_id", sa.Integer(), primary_key=True),
+        sa.Column("newest_year_recorded", sa.Integer()),
+        sa.Column("oldest_year_recorded", sa.Integer()),
+        sa.Column("total_count", sa.Integer()),
+    )
+    op.execute(
+        """
+        INSERT INTO fish_site_species_summary
+        SELECT area_id, species_id, max(event_date_year), min(event_date_year),
+               sum(nullif(fish_count, '')::int)
+        FROM fish_survey
+        WHERE area_id IS NOT NULL AND species_id IS NOT NULL
+        GROUP BY area_id, species_id
+        """
+    )
+    # statement level with a transition table, so a COPY of a million rows
+    # folds into the summary with one grouped upsert rather than per row
+    op.execute(
+        """
+        CREATE FUNCTION fish_site_species_summary_insert() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO fish_site_species_summary AS summary
+            SELECT area_id, species_id, max(event_date_year), min(event_date_year),
+                   sum(nullif(fish_count, '')::int)
+            FROM new_surveys
+            WHERE area_id IS NOT NULL AND species_id IS NOT NULL
+            GROUP BY area_id, species_id
+            ON CONFLICT (area_id, species_id) DO UPDATE SET
+                newest_year_recorded = greatest(
+                    summary.newest_year_recorded, excluded.newest_year_recorded
+                ),
+                oldest_year_recorded = least(
+                    summary.oldest_year_recorded, excluded.oldest_year_recorded
+                ),
+                total_count = CASE
+                    WHEN summary.total_count IS NULL AND excluded.total_count IS NULL
+                    THEN NULL
+                    ELSE coalesce(summary.total_count, 0)
+                        + coalesce(excluded.total_count, 0)
+                END;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER fish_survey_summary_insert
+        AFTER INSERT ON fish_survey
+        REFERENCING NEW TABLE AS new_surveys
+        FOR EACH STATEMENT EXECUTE FUNCTION fish_site_species_summary_insert()
+        """
+    )
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS fish_survey_summary_insert ON fish_survey")
+    op.execute("DROP FUNCTION IF EXISTS fish_site_species_summary_insert()")
+    op.drop_table("fish_site_species_summary")
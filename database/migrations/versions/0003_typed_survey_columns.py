@@ -0,0 +1,70 @@
+"""store fish_survey.fish_count as integer and event_date as date
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+"""
+
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+SUMMARY_INSERT_FUNCTION = """
+CREATE OR REPLACE FUNCTION fish_site_species_summary_insert() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO fish_site_species_summary AS summary
+    SELECT area_id, species_id, max(event_date_year), min(event_date_year),
+           sum({fish_count})
+    FROM new_surveys
+    WHERE area_id IS NOT NULL AND species_id IS NOT NULL
+    GROUP BY area_id, species_id
+    ON CONFLICT (area_id, species_id) DO UPDATE SET
+        newest_year_recorded = greatest(
+            summary.newest_year_recorded, excluded.newest_year_recorded
+        ),
+        oldest_year_recorded = least(
+            summary.oldest_year_recorded, excluded.oldest_year_recorded
+        ),
+        total_count = CASE
+            WHEN summary.total_count IS NULL AND excluded.total_count IS NULL
+            THEN NULL
+            ELSE coalesce(summary.total_count, 0) + coalesce(excluded.total_count, 0)
+        END;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def upgrade():
+    # the seed csv writes dates as dd/mm/yyyy, anything already iso is cast as is
+    op.execute(
+        """
+        ALTER TABLE fish_survey
+            ALTER COLUMN fish_count TYPE integer
+                USING nullif(trim(fish_count), '')::integer,
+            ALTER COLUMN event_date TYPE date
+                USING CASE
+                    WHEN event_date ~ '^\\d{4}-\\d{2}-\\d{2}' THEN event_date::date
+                    ELSE to_date(nullif(trim(event_date), ''), 'DD/MM/YYYY')
+                END
+        """
+    )
+    op.execute(SUMMARY_INSERT_FUNCTION.format(fish_count="fish_count"))
+    op.execute("ANALYZE fish_survey")
+
+
+def downgrade():
+    op.execute(
+        """
+        ALTER TABLE fish_survey
+            ALTER COLUMN fish_count TYPE varchar USING fish_count::varchar,
+            ALTER COLUMN event_date TYPE varchar
+                USING to_char(event_date, 'DD/MM/YYYY')
+        """
+    )
+    op.execute(SUMMARY_INSERT_FUNCTION.format(fish_count="nullif(fish_count, '')::int"))
@@ -0,0 +1,36 @@
+"""index fish_survey grid references for bounding box filters
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+"""
+
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_fish_survey_easting_northing",
+            "fish_survey",
+            ["survey_ranked_easting", "survey_ranked_northing"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+    op.execute("ANALYZE fish_survey")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_fish_survey_easting_northing",
+            table_name="fish_survey",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
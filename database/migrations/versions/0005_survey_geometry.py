@@ -0,0 +1,43 @@
+"""generated british national grid point on fish_survey with a gist index
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+"""
+
+from alembic import op
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS postgis")
+    # stored generated column, so ingestion and the seed COPY never set it
+    op.execute(
+        """
+        ALTER TABLE fish_survey ADD COLUMN IF NOT EXISTS geom geometry(Point, 27700)
+        GENERATED ALWAYS AS (
+            ST_SetSRID(
+                ST_MakePoint(survey_ranked_easting, survey_ranked_northing), 27700
+            )
+        ) STORED
+        """
+    )
+    with op.get_context().autocommit_block():
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_fish_survey_geom
+            ON fish_survey USING gist (geom)
+            """
+        )
+    op.execute("ANALYZE fish_survey")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_fish_survey_geom")
+    op.execute("ALTER TABLE fish_survey DROP COLUMN IF EXISTS geom")
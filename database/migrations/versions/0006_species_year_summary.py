@@ -0,0 +1,71 @@
+"""species x year rollup of fish_survey, kept current by an insert trigger
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "fish_species_year_summary",
+        sa.Column("species_id", sa.Integer(), primary_key=True),
+        sa.Column("event_date_year", sa.Integer(), primary_key=True),
+        sa.Column("total_count", sa.Integer()),
+        sa.Column("survey_count", sa.Integer(), nullable=False),
+    )
+    op.execute(
+        """
+        INSERT INTO fish_species_year_summary
+        SELECT species_id, event_date_year, sum(fish_count), count(*)
+        FROM fish_survey
+        WHERE species_id IS NOT NULL AND event_date_year IS NOT NULL
+        GROUP BY species_id, event_date_year
+        """
+    )
+    # same statement level shape as the site/species summary trigger in 0002
+    op.execute(
+        """
+        CREATE FUNCTION fish_species_year_summary_insert() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO fish_species_year_summary AS summary
+            SELECT species_id, event_date_year, sum(fish_count), count(*)
+            FROM new_surveys
+            WHERE species_id IS NOT NULL AND event_date_year IS NOT NULL
+            GROUP BY species_id, event_date_year
+            ON CONFLICT (species_id, event_date_year) DO UPDATE SET
+                total_count = CASE
+                    WHEN summary.total_count IS NULL AND excluded.total_count IS NULL
+                    THEN NULL
+                    ELSE coalesce(summary.total_count, 0)
+                        + coalesce(excluded.total_count, 0)
+                END,
+                survey_count = summary.survey_count + excluded.survey_count;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER fish_survey_year_summary_insert
+        AFTER INSERT ON fish_survey
+        REFERENCING NEW TABLE AS new_surveys
+        FOR EACH STATEMENT EXECUTE FUNCTION fish_species_year_summary_insert()
+        """
+    )
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS fish_survey_year_summary_insert ON fish_survey")
+    op.execute("DROP FUNCTION IF EXISTS fish_species_year_summary_insert()")
+    op.drop_table("fish_species_year_summary")
@@ -0,0 +1,48 @@
+"""trigram indexes for site and species name search
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+
+"""
+
+from alembic import op
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+# must match SITE_SEARCH_TEXT / SPECIES_SEARCH_TEXT in src/fish/db/models.py,
+# the planner only uses an expression index for the identical expression
+SEARCH_INDEXES = {
+    "ix_fish_sites_search_trgm": (
+        "fish_sites",
+        "(coalesce(site_name, '') || ' ' || coalesce(site_parent_name, '')"
+        " || ' ' || coalesce(top_tier_site, ''))",
+    ),
+    "ix_fish_species_search_trgm": (
+        "fish_species",
+        "(coalesce(species_name, '') || ' ' || coalesce(latin_name, ''))",
+    ),
+}
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        for name, (table, expression) in SEARCH_INDEXES.items():
+            op.execute(
+                f"""
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS {name}
+                ON {table} USING gin ({expression} gin_trgm_ops)
+                """
+            )
+    op.execute("ANALYZE fish_sites")
+    op.execute("ANALYZE fish_species")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name in SEARCH_INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
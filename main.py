@@ -5,14 +5,29 @@ from fastapi import FastAPI
 from fastapi.responses import JSONResponse
 from starlette.requests import Request
 
-from src.fish.db.engine import Creds, init_db
+from src.fish.db.engine import (
+    AsyncDBSession,
+    Creds,
+    DBSession,
+    init_async_db,
+    init_db,
+    use_async_db,
+)
 from src.fish.middleware import (
+    add_conditional_get_headers,
+    collect_request_metrics,
+    compress_response,
+    configure_cache_control,
+    configure_count_cache,
     fail_with_bad_query_params,
     wrap_response_with_pagination_results,
 )
-from src.fish.routers.sites import router as sites_router
-from src.fish.routers.species import router as species_router
-from src.fish.routers.surverys import router as surveys_router
+from src.fish.routers import internal, metrics, sites, species, surverys
+from src.fish.utils.operation_cache import configure_operation_cache
+from src.fish.utils.compression import COMPRESSION
+from src.fish.utils.metrics import METRICS, instrument_engine
+from src.fish.utils.query_log import QUERY_LOG, instrument_query_log
+from src.fish.utils.serialization import FAST_RESPONSES
 
 app = FastAPI()
 AVAILABLE_PATHS = ("sites", "species", "surveys")
@@ -30,6 +45,23 @@ def get_creds() -> Creds:
 async def startup_event():
     creds = get_creds()
     init_db(creds)
+    if use_async_db(creds):
+        init_async_db(creds)
+    configure_count_cache(creds)
+    configure_cache_control(creds)
+    FAST_RESPONSES.configure(creds)
+    configure_operation_cache(creds)
+    COMPRESSION.configure(creds)
+    METRICS.configure(creds)
+    QUERY_LOG.configure(creds)
+    internal.INTERNAL.configure(creds)
+    if METRICS.enabled or QUERY_LOG.enabled:
+        engines = [DBSession.kw["bind"]]
+        if use_async_db(creds):
+            engines.append(AsyncDBSession.kw["bind"].sync_engine)
+        for engine in engines:
+            instrument_engine(engine)
+            instrument_query_log(engine)
 
 
 @app.get("/")
@@ -40,8 +72,19 @@ async def home(request: Request):
     )
 
 
-app.include_router(router=species_router)
-app.include_router(router=sites_router)
-app.include_router(router=surveys_router)
+if use_async_db(get_creds()):
+    routers = (species.async_router, sites.async_router, surverys.async_router)
+else:
+    routers = (species.router, sites.router, surverys.router)
+for router in routers:
+    app.include_router(router=router)
+app.include_router(router=internal.router)
+app.include_router(router=metrics.router)
 app.middleware("http")(fail_with_bad_query_params)
 app.middleware("http")(wrap_response_with_pagination_results)
+# registered last so it wraps the others and hashes the final envelope
+app.middleware("http")(add_conditional_get_headers)
+# outermost, compresses exactly the bytes the ETag was computed over
+app.middleware("http")(compress_response)
+# times the whole stack, compression included
+app.middleware("http")(collect_request_metrics)
@@ -2,10 +2,26 @@ from typing import TypedDict
 from sqlalchemy import URL
 
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
+from src.fish.db.pool import (
+    TimedAsyncAdaptedQueuePool,
+    TimedQueuePool,
+    get_pool_status,
+)
 
-class Creds(TypedDict):
+
+class PoolSettings(TypedDict, total=False):
+    PGPOOL_SIZE: int
+    PGPOOL_MAX_OVERFLOW: int
+    PGPOOL_TIMEOUT: float
+    PGPOOL_RECYCLE: int
+    PGPOOL_PRE_PING: bool
+    PGSTATEMENT_TIMEOUT: int
+
+
+class Creds(PoolSettings):
     PGPASSWORD: str
     PGUSER: str
     PGDBNAME: str
@@ -14,11 +30,12 @@ class Creds(TypedDict):
 
 
 DBSession = sessionmaker()
+AsyncDBSession = async_sessionmaker()
 
 
-def build_conn_string(creds: Creds) -> URL:
+def build_conn_string(creds: Creds, drivername: str = "postgresql") -> URL:
     return URL.create(
-        "postgresql",
+        drivername,
         username=creds["PGUSER"],
         password=creds["PGPASSWORD"],  # plain (unescaped) text
         host=creds["PGHOST"],
@@ -27,15 +44,74 @@ def build_conn_string(creds: Creds) -> URL:
     )
 
 
+def _is_enabled(value) -> bool:
+    return str(value).lower() == "true"
+
+
+def build_pool_kwargs(creds: Creds) -> dict:
+    return dict(
+        pool_size=int(creds.get("PGPOOL_SIZE", 5)),
+        max_overflow=int(creds.get("PGPOOL_MAX_OVERFLOW", 10)),
+        pool_timeout=float(creds.get("PGPOOL_TIMEOUT", 30)),
+        pool_recycle=int(creds.get("PGPOOL_RECYCLE", -1)),
+        pool_pre_ping=_is_enabled(creds.get("PGPOOL_PRE_PING", False)),
+    )
+
+
+def build_connect_args(creds: Creds, is_async: bool = False) -> dict:
+    # milliseconds, 0 leaves the server default (no timeout) in place
+    statement_timeout = int(creds.get("PGSTATEMENT_TIMEOUT", 0))
+    if not statement_timeout:
+        return {}
+    if is_async:
+        return {"server_settings": {"statement_timeout": str(statement_timeout)}}
+    return {"options": f"-c statement_timeout={statement_timeout}"}
+
+
 def init_db(creds: Creds):
     url = build_conn_string(creds)
-    engine = create_engine(url)
+    engine = create_engine(
+        url,
+        poolclass=TimedQueuePool,
+        connect_args=build_connect_args(creds),
+        **build_pool_kwargs(creds),
+    )
     DBSession.configure(bind=engine)
 
 
+def init_async_db(creds: Creds):
+    url = build_conn_string(creds, drivername="postgresql+asyncpg")
+    engine = create_async_engine(
+        url,
+        poolclass=TimedAsyncAdaptedQueuePool,
+        connect_args=build_connect_args(creds, is_async=True),
+        **build_pool_kwargs(creds),
+    )
+    AsyncDBSession.configure(bind=engine)
+
+
+def use_async_db(settings: dict) -> bool:
+    return _is_enabled(settings.get("DB_ASYNC", False))
+
+
+def get_pool_statuses() -> dict:
+    # only the engines that were initialised, keyed sync / async
+    statuses = {}
+    for name, session in (("sync", DBSession), ("async", AsyncDBSession)):
+        engine = session.kw.get("bind")
+        if engine is not None:
+            statuses[name] = get_pool_status(engine.pool)
+    return statuses
+
+
 def get_db():
     db = DBSession()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncDBSession() as db:
+        yield db
@@ -0,0 +1,277 @@
+import argparse
+import csv
+import io
+import time
+import urllib.request
+from collections import namedtuple
+from typing import Iterator, List, TextIO, Tuple
+
+from dotenv import dotenv_values
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from src.fish.db.engine import DBSession, init_db
+from src.fish.db.models import DBSites, DBSpecies, DBSurvey
+from src.fish.operations.aggregates import refresh_species_year_summary
+from src.fish.operations.sites import refresh_site_species_summary
+from src.fish.routers.internal import TOKEN_HEADER
+
+TableSpec = namedtuple("TableSpec", ("model", "columns", "key"))
+IngestReport = namedtuple(
+    "IngestReport",
+    ("table", "rows_read", "inserted", "updated", "rejected", "seconds"),
+)
+DEFAULT_BATCH_SIZE = 50_000
+# csv header -> column, where the published files don't use our column names
+CSV_HEADER_ALIASES = {"geo_waterbody": "geo_water_body"}
+
+# (cast, check) per column kind, "{c}" is swapped for the staging column.
+# everything lands in staging as text so a bad value is counted, not fatal
+COLUMN_KINDS = {
+    "text": ("{c}", "true"),
+    "required_text": ("{c}", "trim({c}) <> ''"),
+    "integer": (
+        "nullif(trim({c}), '')::integer",
+        r"coalesce(trim({c}), '') ~ '^-?\d*$'",
+    ),
+    "required_integer": ("trim({c})::integer", r"trim({c}) ~ '^-?\d+$'"),
+    "uuid": (
+        "trim({c})::uuid",
+        r"trim({c}) ~* '^[0-9a-f]{8}-?([0-9a-f]{4}-?){3}[0-9a-f]{12}$'",
+    ),
+    # same dd/mm/yyyy or iso handling as migration 0003
+    "date": (
+        r"CASE WHEN {c} ~ '^\d{4}-\d{2}-\d{2}' THEN {c}::date "
+        "ELSE to_date(nullif(trim({c}), ''), 'DD/MM/YYYY') END",
+        r"coalesce(trim({c}), '') ~ '^(\d{4}-\d{2}-\d{2}|\d{2}/\d{2}/\d{4})?$'",
+    ),
+}
+
+TABLE_SPECS = {
+    "species": TableSpec(
+        model=DBSpecies,
+        columns=(
+            ("id", "required_integer"),
+            ("species_name", "required_text"),
+            ("latin_name", "text"),
+        ),
+        key="id",
+    ),
+    "sites": TableSpec(
+        model=DBSites,
+        columns=(
+            ("id", "required_text"),
+            ("top_tier_site", "text"),
+            ("site_parent_name", "text"),
+            ("site_name", "text"),
+            ("geo_water_body", "text"),
+        ),
+        key="id",
+    ),
+    "surveys": TableSpec(
+        model=DBSurvey,
+        columns=(
+            ("id", "uuid"),
+            ("survey_id", "required_integer"),
+            ("event_date", "date"),
+            ("event_date_year", "integer"),
+            ("survey_ranked_easting", "integer"),
+            ("survey_ranked_northing", "integer"),
+            ("species_id", "integer"),
+            ("area_id", "text"),
+            ("fish_count", "integer"),
+        ),
+        key="id",
+    ),
+}
+
+
+def staging_table_name(spec: TableSpec) -> str:
+    return f"{spec.model.__tablename__}_staging"
+
+
+def column_cast(spec: TableSpec, name: str) -> str:
+    kind = dict(spec.columns)[name]
+    return COLUMN_KINDS[kind][0].replace("{c}", name)
+
+
+def build_staging_sql(spec: TableSpec) -> str:
+    columns = ", ".join(f"{name} text" for name, _ in spec.columns)
+    return f"CREATE TEMP TABLE {staging_table_name(spec)} ({columns}) ON COMMIT DROP"
+
+
+def build_valid_predicate(spec: TableSpec) -> str:
+    checks = " AND ".join(
+        COLUMN_KINDS[kind][1].replace("{c}", name) for name, kind in spec.columns
+    )
+    return f"coalesce(({checks}), false)"
+
+
+def build_rejected_sql(spec: TableSpec) -> str:
+    return (
+        f"SELECT count(*) FROM {staging_table_name(spec)} "
+        f"WHERE NOT {build_valid_predicate(spec)}"
+    )
+
+
+def build_upsert_sql(spec: TableSpec) -> str:
+    names = [name for name, _ in spec.columns]
+    casts = ", ".join(column_cast(spec, name) for name in names)
+    key = column_cast(spec, spec.key)
+    updates = ", ".join(
+        f"{name} = excluded.{name}" for name in names if name != spec.key
+    )
+    # distinct on the key so a row repeated in the file can't hit the
+    # "affect row a second time" error, xmax = 0 tells inserts from updates
+    return f"""
+        WITH upserted AS (
+            INSERT INTO {spec.model.__tablename__} ({", ".join(names)})
+            SELECT DISTINCT ON ({key}) {casts}
+            FROM {staging_table_name(spec)}
+            WHERE {build_valid_predicate(spec)}
+            ORDER BY {key}
+            ON CONFLICT ({spec.key}) DO UPDATE SET {updates}
+            RETURNING (xmax = 0) AS inserted
+        )
+        SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted)
+        FROM upserted
+        """
+
+
+def build_affected_keys_sql(spec: TableSpec) -> str:
+    # the (area, species) pairs a survey load can move, including where
+    # updated rows came from
+    staging = staging_table_name(spec)
+    return f"""
+        SELECT area_id, {column_cast(spec, "species_id")} FROM {staging}
+        WHERE {build_valid_predicate(spec)}
+        UNION
+        SELECT area_id, species_id FROM fish_survey WHERE id IN (
+            SELECT {column_cast(spec, "id")} FROM {staging}
+            WHERE {build_valid_predicate(spec)}
+        )
+        """
+
+
+def iter_csv_batches(
+    file: TextIO, columns: List[str], batch_size: int
+) -> Iterator[Tuple[io.StringIO, int, int]]:
+    # yields (csv buffer, rows in it, ragged rows skipped), re-written in
+    # the staging column order whatever order the file header uses
+    reader = csv.reader(file)
+    header = [CSV_HEADER_ALIASES.get(name, name) for name in next(reader)]
+    if sorted(header) != sorted(columns):
+        raise ValueError(f"expected columns {columns}, got {header}")
+    order = [header.index(name) for name in columns]
+    buffer, writer, rows, ragged = None, None, 0, 0
+    for record in reader:
+        if buffer is None:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+        if len(record) != len(header):
+            ragged += 1
+            continue
+        writer.writerow([record[i] for i in order])
+        rows += 1
+        if rows == batch_size:
+            buffer.seek(0)
+            yield buffer, rows, ragged
+            buffer, writer, rows, ragged = None, None, 0, 0
+    if rows or ragged:
+        buffer.seek(0)
+        yield buffer, rows, ragged
+
+
+def ingest_csv(
+    db: Session, spec: TableSpec, file: TextIO, batch_size: int = DEFAULT_BATCH_SIZE
+) -> IngestReport:
+    start = time.perf_counter()
+    names = [name for name, _ in spec.columns]
+    staging = staging_table_name(spec)
+    db.execute(text(build_staging_sql(spec)))
+    cursor = db.connection().connection.dbapi_connection.cursor()
+    rows_read, rejected = 0, 0
+    for buffer, rows, ragged in iter_csv_batches(file, names, batch_size):
+        cursor.copy_expert(
+            f"COPY {staging} ({', '.join(names)}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+        rows_read += rows + ragged
+        rejected += ragged
+    db.execute(text(f"ANALYZE {staging}"))
+    rejected += db.execute(text(build_rejected_sql(spec))).scalar()
+
+    affected = []
+    if spec.model is DBSurvey:
+        affected = db.execute(text(build_affected_keys_sql(spec))).all()
+    inserted, updated = db.execute(text(build_upsert_sql(spec))).one()
+    if updated and affected:
+        # the insert triggers only see new rows, rebuild where rows changed,
+        # in the load's transaction so readers never see one summary moved
+        # without the other
+        area_ids = sorted({area for area, _ in affected if area is not None})
+        species_ids = sorted(
+            {species for _, species in affected if species is not None}
+        )
+        refresh_site_species_summary(db, area_ids, commit=False)
+        refresh_species_year_summary(db, species_ids, commit=False)
+    db.commit()
+
+    return IngestReport(
+        table=spec.model.__tablename__,
+        rows_read=rows_read,
+        inserted=inserted,
+        updated=updated,
+        rejected=rejected,
+        seconds=time.perf_counter() - start,
+    )
+
+
+def format_report(report: IngestReport) -> str:
+    rows_per_second = report.rows_read / report.seconds if report.seconds else 0
+    return (
+        f"{report.table}: read {report.rows_read} rows in {report.seconds:.1f}s "
+        f"({rows_per_second:,.0f} rows/s), inserted {report.inserted}, "
+        f"updated {report.updated}, rejected {report.rejected}"
+    )
+
+
+def invalidate_api_caches(api_url: str, token: str):
+    # the api's caches live in its own process, ask it to drop them
+    request = urllib.request.Request(
+        f"{api_url.rstrip('/')}/internal/cache/invalidate",
+        method="POST",
+        headers={TOKEN_HEADER: token},
+    )
+    with urllib.request.urlopen(request, timeout=10):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="load fish csvs into postgres")
+    parser.add_argument("table", choices=sorted(TABLE_SPECS))
+    parser.add_argument("path")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument(
+        "--api-url", help="running api to invalidate, e.g. http://localhost:8000"
+    )
+    args = parser.parse_args()
+
+    creds = dotenv_values(".env")
+    if args.api_url and not creds.get("INTERNAL_TOKEN"):
+        parser.error("--api-url needs INTERNAL_TOKEN, the api's, set in .env")
+    init_db(creds)
+    with DBSession() as session, open(args.path, newline="") as file:
+        report = ingest_csv(session, TABLE_SPECS[args.table], file, args.batch_size)
+    print(format_report(report))
+    if args.api_url:
+        invalidate_api_caches(args.api_url, creds["INTERNAL_TOKEN"])
+    else:
+        print(
+            "a running api keeps serving cached counts, results and etags until "
+            "COUNT_CACHE_TTL / OPERATION_CACHE_TTL / ETAG_CACHE_TTL expire"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,14 @@
-from sqlalchemy import Column, ForeignKey, Integer, MetaData, String, Uuid
+from sqlalchemy import (
+    Column,
+    Date,
+    ForeignKey,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Uuid,
+    literal_column,
+)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -25,7 +35,7 @@ class DBSurvey(Base):
     __tablename__ = "fish_survey"
     id = Column(Uuid, primary_key=True)
     survey_id = Column(Integer, nullable=False)
-    event_date = Column(String)
+    event_date = Column(Date)
     event_date_year = Column(Integer)
     survey_ranked_easting = Column(Integer)
     survey_ranked_northing = Column(Integer)
@@ -33,4 +43,58 @@ class DBSurvey(Base):
     species = relationship(DBSpecies)
     area_id = Column(String, ForeignKey("fish_sites.id"))
     area = relationship(DBSites)
-    fish_count = Column(String)
+    fish_count = Column(Integer)
+
+    __table_args__ = (
+        # covers the per-site species aggregate without touching the heap
+        Index(
+            "ix_fish_survey_area_id_species_id",
+            "area_id",
+            "species_id",
+            postgresql_include=["event_date_year", "fish_count"],
+        ),
+        Index("ix_fish_survey_species_id_area_id", "species_id", "area_id"),
+        Index("ix_fish_survey_event_date_year", "event_date_year"),
+        Index(
+            "ix_fish_survey_easting_northing",
+            "survey_ranked_easting",
+            "survey_ranked_northing",
+        ),
+    )
+
+
+# british national grid, what survey_ranked_easting/northing are recorded in
+BNG_SRID = 27700
+# generated from the grid reference by migration 0005; left off the mapped
+# table since it only exists on postgis
+SURVEY_GEOM = literal_column("fish_survey.geom")
+# the expressions the trigram indexes in migration 0007 are built on
+SITE_SEARCH_TEXT = literal_column(
+    "(coalesce(fish_sites.site_name, '') || ' ' || "
+    "coalesce(fish_sites.site_parent_name, '') || ' ' || "
+    "coalesce(fish_sites.top_tier_site, ''))"
+)
+SPECIES_SEARCH_TEXT = literal_column(
+    "(coalesce(fish_species.species_name, '') || ' ' || "
+    "coalesce(fish_species.latin_name, ''))"
+)
+
+
+class DBSiteSpeciesSummary(Base):
+    # maintained by the fish_survey insert trigger, see migration 0002
+    __tablename__ = "fish_site_species_summary"
+    area_id = Column(String, primary_key=True)
+    species_id = Column(Integer, primary_key=True)
+    newest_year_recorded = Column(Integer)
+    oldest_year_recorded = Column(Integer)
+    total_count = Column(Integer)
+
+
+class DBSpeciesYearSummary(Base):
+    # species x year rollup, maintained by the fish_survey insert trigger in
+    # migration 0006
+    __tablename__ = "fish_species_year_summary"
+    species_id = Column(Integer, primary_key=True)
+    event_date_year = Column(Integer, primary_key=True)
+    total_count = Column(Integer)
+    survey_count = Column(Integer, nullable=False)
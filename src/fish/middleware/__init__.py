@@ -1,24 +1,75 @@
+import hashlib
 import json
+import time
 import urllib.parse
 import uuid
 from collections import namedtuple
 from typing import Optional, Union
 
 from fastapi import Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from starlette.datastructures import URL, QueryParams
 
 from src.fish.db.engine import DBSession
 from src.fish.db.models import Base, DBSites, DBSpecies, DBSurvey
+from src.fish.operations.input_models import SurveyFilters
 from src.fish.utils.query_builder import (
+    NEXT_CURSOR_HEADER,
+    TOTAL_COUNT_HEADER,
     PaginationError,
     _validate_paginate_param,
+    get_estimated_model_count,
     get_model_count,
 )
+from src.fish.utils.compression import (
+    COMPRESSIBLE_TYPES,
+    COMPRESSION,
+    compress,
+    compress_stream,
+    negotiate_encoding,
+)
+from src.fish.utils.count_cache import ModelCountCache
+from src.fish.utils.metrics import (
+    METRICS,
+    REQUEST_STATS,
+    RequestStats,
+    observe_request,
+    record_serialization,
+    scope_route,
+)
+from src.fish.utils.query_log import QUERY_LOG, check_query_budget
+from src.fish.utils.operation_cache import COMPRESSED_CACHE, ETAG_CACHE, MISSING
 
 MODEL_MAP = {"/sites": DBSites, "/surveys": DBSurvey, "/species": DBSpecies}
 MAX_LIMIT = 100
+# metres on the national grid, wider would scan most of a region's surveys
+MAX_RADIUS = 50_000
+CURSOR_PARAM = "cursor"
+SURVEY_FILTER_PARAMS = set(SurveyFilters.model_fields)
+EXTRA_QUERY_PARAMS = {
+    "/surveys": {"expand", *SURVEY_FILTER_PARAMS},
+    "/surveys/export": {"format", *SURVEY_FILTER_PARAMS},
+    "/surveys/near": {"easting", "northing", "radius"},
+    "/surveys/nearest": {"easting", "northing", "k"},
+    "/sites/near": {"easting", "northing", "radius"},
+    "/surveys/yearly": {"species_id", "year_from", "year_to", "by"},
+    "/sites/search": {"q"},
+    "/species/search": {"q"},
+}
 PaginationKeys = namedtuple("PaginationKeys", ("limit", "skip"))
+COUNT_CACHE = ModelCountCache()
+# keyed on the first path segment, i.e. the router prefix
+CACHE_CONTROL = {
+    "species": "public, max-age=3600",
+    "sites": "public, max-age=3600",
+    "surveys": "public, max-age=300",
+    "internal": "no-store",
+    "metrics": "no-store",
+}
+DEFAULT_CACHE_CONTROL = "no-cache"
+# reference data, few distinct bodies served over and over
+PRECOMPRESSED_PREFIXES = {"species", "sites"}
 
 
 def build_next_url(url: URL, skip: int, limit: int) -> str:
@@ -28,6 +79,13 @@ def build_next_url(url: URL, skip: int, limit: int) -> str:
     return f"{url}?{parsed_params}"
 
 
+def build_next_cursor_url(url: URL, cursor: str, limit: int) -> str:
+    params = {CURSOR_PARAM: cursor, "limit": limit}
+    url = url.remove_query_params(keys=[CURSOR_PARAM, "limit"])
+    parsed_params = urllib.parse.urlencode(params)
+    return f"{url}?{parsed_params}"
+
+
 def validate_offset_and_limit(
     query_params: QueryParams, count: int
 ) -> Union[PaginationKeys, JSONResponse]:
@@ -46,6 +104,17 @@ def validate_offset_and_limit(
         return JSONResponse(status_code=400, content={"reason": str(e)})
 
 
+def validate_cursor_and_limit(
+    query_params: QueryParams,
+) -> Union[PaginationKeys, JSONResponse]:
+    if "skip" in query_params:
+        return JSONResponse(
+            status_code=400,
+            content={"reason": f"skip cannot be combined with {CURSOR_PARAM}"},
+        )
+    return validate_offset_and_limit(query_params, 0)
+
+
 def generate_next_url(
     cur_limit: int, cur_skip: int, request: Request, total_count: int
 ) -> Optional[str]:
@@ -55,33 +124,223 @@ def generate_next_url(
         return build_next_url(request.url, next_skip, cur_limit)
 
 
-async def wrap_response_in_meta_data(response, total_count: int, next_url: str):
-    response_data = b"".join([i async for i in response.body_iterator]).decode()
-    data = json.loads(response_data)
-    return JSONResponse(
-        status_code=response.status_code,
-        content={"total_count": total_count, "next_url": next_url, "data": data},
+async def read_response_body(response) -> bytes:
+    return b"".join([i async for i in response.body_iterator])
+
+
+def build_envelope(body: bytes, **meta) -> bytes:
+    # splice the route's already serialized rows in rather than decoding them
+    meta_json = json.dumps(meta, separators=(",", ":"))
+    return meta_json[:-1].encode() + b',"data":' + body + b"}"
+
+
+async def wrap_response_in_meta_data(response, total_count: int, next_url: str, **meta):
+    body = await read_response_body(response)
+    start = time.perf_counter()
+    content = build_envelope(body, total_count=total_count, next_url=next_url, **meta)
+    record_serialization(time.perf_counter() - start)
+    return Response(
+        content=content, status_code=response.status_code, media_type="application/json"
     )
 
 
-def _get_model_count(model: Base):
+async def wrap_response_in_cursor_meta_data(
+    request: Request, response, total_count: int
+):
+    page = validate_cursor_and_limit(request.query_params)
+    if isinstance(page, JSONResponse):
+        return page
+    next_cursor = response.headers.get(NEXT_CURSOR_HEADER)
+    next_url = None
+    if next_cursor:
+        next_url = build_next_cursor_url(request.url, next_cursor, page.limit)
+    return await wrap_response_in_meta_data(
+        response, total_count=total_count, next_url=next_url, next_cursor=next_cursor
+    )
+
+
+def configure_count_cache(settings: dict):
+    COUNT_CACHE.configure(
+        ttl=float(settings.get("COUNT_CACHE_TTL", 60)),
+        estimated=settings.get("COUNT_ESTIMATED", "false").lower() == "true",
+    )
+
+
+def _count_model(model: Base) -> int:
     with DBSession() as session:
+        if COUNT_CACHE.estimated:
+            return get_estimated_model_count(session, model)
         return get_model_count(session, model)
 
 
+def _get_model_count(model: Base):
+    return COUNT_CACHE.get(model, lambda: _count_model(model))
+
+
 async def wrap_response_with_pagination_results(request: Request, call_next):
     response = await call_next(request)
+    if response.status_code != 200:
+        return response
     model = MODEL_MAP.get(request.url.path)
-    if model is not None and response.status_code == 200:
-        total_count = _get_model_count(model)
-        page = validate_offset_and_limit(request.query_params, total_count)
-        # bit of a smell but you can't raise HTTPExceptions in fast api middleware
-        if isinstance(page, JSONResponse):
-            return page
-        next_url = generate_next_url(page.limit, page.skip, request, total_count)
-        return await wrap_response_in_meta_data(
-            response, total_count=total_count, next_url=next_url
+    # routes outside MODEL_MAP (nested ones) opt in by reporting their own count
+    route_count = response.headers.get(TOTAL_COUNT_HEADER)
+    if model is None and route_count is None:
+        return response
+    if route_count is not None:
+        total_count = int(route_count)
+    else:
+        # the count uses the sync session, keep it (and any cache-miss query)
+        # off the event loop whichever db mode the routes run in
+        total_count = await run_in_threadpool(_get_model_count, model)
+    if CURSOR_PARAM in request.query_params:
+        return await wrap_response_in_cursor_meta_data(request, response, total_count)
+    page = validate_offset_and_limit(request.query_params, total_count)
+    # bit of a smell but you can't raise HTTPExceptions in fast api middleware
+    if isinstance(page, JSONResponse):
+        return page
+    next_url = generate_next_url(page.limit, page.skip, request, total_count)
+    return await wrap_response_in_meta_data(
+        response, total_count=total_count, next_url=next_url
+    )
+
+
+def configure_cache_control(settings: dict):
+    for prefix in CACHE_CONTROL:
+        value = settings.get(f"CACHE_CONTROL_{prefix.upper()}")
+        if value is not None:
+            CACHE_CONTROL[prefix] = value
+
+
+def get_cache_control(path: str) -> str:
+    prefix = path.strip("/").split("/")[0]
+    return CACHE_CONTROL.get(prefix, DEFAULT_CACHE_CONTROL)
+
+
+def build_etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored
+    candidates = [i.strip().removeprefix("W/") for i in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    return Response(
+        status_code=304, headers={"etag": etag, "cache-control": cache_control}
+    )
+
+
+async def add_conditional_get_headers(request: Request, call_next):
+    if request.method not in ("GET", "HEAD"):
+        return await call_next(request)
+    cache_control = get_cache_control(request.url.path)
+    if "no-store" in cache_control:
+        # live endpoints (internal, metrics) are never tagged or answered
+        # from the ETag cache
+        response = await call_next(request)
+        response.headers["cache-control"] = cache_control
+        return response
+    cache_key = str(request.url)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        # a recently served ETag answers the request without running the route
+        etag = ETAG_CACHE.get(cache_key)
+        if etag is not MISSING and etag_matches(if_none_match, etag):
+            return not_modified(etag, cache_control)
+
+    response = await call_next(request)
+    # only hash json bodies, streamed exports have to stay streamed
+    if response.status_code != 200 or not response.headers.get(
+        "content-type", ""
+    ).startswith("application/json"):
+        return response
+    body = await read_response_body(response)
+    etag = build_etag(body)
+    ETAG_CACHE.set(cache_key, etag)
+    if if_none_match and etag_matches(if_none_match, etag):
+        return not_modified(etag, cache_control)
+    headers = dict(response.headers)
+    headers.update({"etag": etag, "cache-control": cache_control})
+    return Response(content=body, status_code=200, headers=headers)
+
+
+def is_compressible(response) -> bool:
+    content_type = response.headers.get("content-type", "").split(";")[0].strip()
+    return (
+        content_type in COMPRESSIBLE_TYPES
+        and "content-encoding" not in response.headers
+    )
+
+
+def compressed_headers(response, encoding: str) -> dict:
+    headers = dict(response.headers)
+    headers.pop("content-length", None)
+    headers["content-encoding"] = encoding
+    # the compressed bytes differ from what the strong ETag was hashed from
+    etag = headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        headers["etag"] = f"W/{etag}"
+    return headers
+
+
+def compress_body(path: str, body: bytes, encoding: str, etag: Optional[str]) -> bytes:
+    prefix = path.strip("/").split("/")[0]
+    if etag is None or prefix not in PRECOMPRESSED_PREFIXES:
+        return compress(body, encoding)
+    cache_key = (etag, encoding)
+    compressed = COMPRESSED_CACHE.get(cache_key)
+    if compressed is MISSING:
+        compressed = compress(body, encoding)
+        COMPRESSED_CACHE.set(cache_key, compressed)
+    return compressed
+
+
+async def compress_response(request: Request, call_next):
+    response = await call_next(request)
+    if not COMPRESSION.enabled or not is_compressible(response):
+        return response
+    response.headers.add_vary_header("accept-encoding")
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    if encoding is None:
+        return response
+    if "content-length" not in response.headers:
+        # streamed exports are compressed chunk by chunk, whatever their size
+        return StreamingResponse(
+            compress_stream(response.body_iterator, encoding),
+            status_code=response.status_code,
+            headers=compressed_headers(response, encoding),
+        )
+    body = await read_response_body(response)
+    if len(body) < COMPRESSION.min_size:
+        return Response(
+            content=body, status_code=response.status_code, headers=response.headers
         )
+    return Response(
+        content=compress_body(
+            request.url.path, body, encoding, response.headers.get("etag")
+        ),
+        status_code=response.status_code,
+        headers=compressed_headers(response, encoding),
+    )
+
+
+async def collect_request_metrics(request: Request, call_next):
+    if not (METRICS.enabled or QUERY_LOG.enabled):
+        return await call_next(request)
+    stats = RequestStats(request.scope)
+    token = REQUEST_STATS.set(stats)
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        REQUEST_STATS.reset(token)
+    seconds = time.perf_counter() - start
+    route = scope_route(request.scope)
+    if METRICS.enabled:
+        observe_request(request.method, route, response.status_code, seconds, stats)
+    check_query_budget(request.method, route, stats)
     return response
 
 
@@ -95,6 +354,9 @@ def is_valid_uuid(id: str):
 
 def retrieve_query_expected_params(path: str) -> set:
     expected_params = {"limit", "skip"}
+    if path in MODEL_MAP:
+        expected_params.add(CURSOR_PARAM)
+    expected_params |= EXTRA_QUERY_PARAMS.get(path, set())
     paths = path.split("/")
     paths_last = paths[len(paths) - 1]
     if paths_last.isdigit() or is_valid_uuid(paths_last):
@@ -0,0 +1,126 @@
+from typing import List, Literal, Optional
+
+from fastapi.exceptions import HTTPException
+from sqlalchemy import Row, Select, delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from src.fish.db.models import DBSites, DBSpeciesYearSummary, DBSurvey
+from src.fish.operations.output_models import YearlyCount
+from src.fish.utils.operation_cache import cached_operation, invalidate_caches
+
+YearlyGrain = Literal["site", "water_body"]
+GRAIN_COLUMNS = {"site": DBSurvey.area_id, "water_body": DBSites.geo_water_body}
+
+
+def species_year_summary_query_builder(
+    species_ids: Optional[List[int]] = None,
+) -> Select:
+    statement = (
+        select(
+            DBSurvey.species_id,
+            DBSurvey.event_date_year,
+            func.sum(DBSurvey.fish_count).label("total_count"),
+            func.count().label("survey_count"),
+        )
+        .filter(DBSurvey.species_id.is_not(None), DBSurvey.event_date_year.is_not(None))
+        .group_by(DBSurvey.species_id, DBSurvey.event_date_year)
+    )
+    if species_ids is not None:
+        statement = statement.filter(DBSurvey.species_id.in_(species_ids))
+    return statement
+
+
+def refresh_species_year_summary(
+    db: Session, species_ids: Optional[List[int]] = None, commit: bool = True
+):
+    # full (or per-species) rebuild; routine inserts are folded in by the db trigger
+    clear = delete(DBSpeciesYearSummary)
+    if species_ids is not None:
+        clear = clear.filter(DBSpeciesYearSummary.species_id.in_(species_ids))
+    db.execute(clear)
+    db.execute(
+        insert(DBSpeciesYearSummary).from_select(
+            ["species_id", "event_date_year", "total_count", "survey_count"],
+            species_year_summary_query_builder(species_ids),
+        )
+    )
+    if commit:
+        db.commit()
+        invalidate_caches()
+
+
+def yearly_counts_query_builder(
+    species_id: Optional[int],
+    year_from: Optional[int],
+    year_to: Optional[int],
+    by: Optional[YearlyGrain] = None,
+) -> Select:
+    if by is None:
+        # the common grain is read straight off the rollup
+        summary = DBSpeciesYearSummary
+        statement = select(
+            summary.species_id,
+            summary.event_date_year,
+            summary.total_count,
+            summary.survey_count,
+        )
+        group = []
+    else:
+        summary = DBSurvey
+        group = [GRAIN_COLUMNS[by]]
+        statement = select(
+            DBSurvey.species_id,
+            DBSurvey.event_date_year,
+            *group,
+            func.sum(DBSurvey.fish_count).label("total_count"),
+            func.count().label("survey_count"),
+        ).group_by(DBSurvey.species_id, DBSurvey.event_date_year, *group)
+        if by == "water_body":
+            statement = statement.join(DBSites, DBSites.id == DBSurvey.area_id)
+    if species_id is not None:
+        statement = statement.filter(summary.species_id == species_id)
+    if year_from is not None:
+        statement = statement.filter(summary.event_date_year >= year_from)
+    if year_to is not None:
+        statement = statement.filter(summary.event_date_year <= year_to)
+    return statement.order_by(summary.species_id, summary.event_date_year, *group)
+
+
+def validate_yearly_grain(species_id: Optional[int], by: Optional[YearlyGrain]):
+    # per site, every species at once is a full table aggregate, keep it scoped
+    if by is not None and species_id is None:
+        raise HTTPException(
+            status_code=400, detail=f"species_id is required when grouping by {by}"
+        )
+
+
+def build_yearly_counts(rows: List[Row]) -> List[YearlyCount]:
+    return [YearlyCount(**row._mapping) for row in rows]
+
+
+@cached_operation
+def get_yearly_counts(
+    db: Session,
+    species_id: Optional[int] = None,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    by: Optional[YearlyGrain] = None,
+) -> List[YearlyCount]:
+    validate_yearly_grain(species_id, by)
+    statement = yearly_counts_query_builder(species_id, year_from, year_to, by)
+    return build_yearly_counts(db.execute(statement).all())
+
+
+@cached_operation
+async def get_yearly_counts_async(
+    db: AsyncSession,
+    species_id: Optional[int] = None,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    by: Optional[YearlyGrain] = None,
+) -> List[YearlyCount]:
+    validate_yearly_grain(species_id, by)
+    statement = yearly_counts_query_builder(species_id, year_from, year_to, by)
+    result = await db.execute(statement)
+    return build_yearly_counts(result.all())
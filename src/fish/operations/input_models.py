@@ -0,0 +1,29 @@
+import uuid
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+MAX_BATCH_SIZE = 100
+
+
+class SiteIds(BaseModel):
+    ids: List[str] = Field(min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+class SpeciesIds(BaseModel):
+    ids: List[int] = Field(min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+class SurveyIds(BaseModel):
+    ids: List[uuid.UUID] = Field(min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+class SurveyFilters(BaseModel):
+    year_from: Optional[int] = None
+    year_to: Optional[int] = None
+    species_id: Optional[int] = None
+    area_id: Optional[str] = None
+    min_easting: Optional[int] = None
+    max_easting: Optional[int] = None
+    min_northing: Optional[int] = None
+    max_northing: Optional[int] = None
@@ -1,5 +1,5 @@
 import uuid
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel
 
@@ -40,4 +40,53 @@ class SurveyResult(BaseModel):
     survey_ranked_northing: int
     species_id: int
     area_id: uuid.UUID
-    fish_count: str
+    fish_count: Optional[int]
+
+
+class ExpandedSurveyResult(SurveyResult):
+    # only present when asked for through ?expand=
+    species: Optional[SpeciesResult] = None
+    area: Optional[SiteResult] = None
+
+
+class SurveyDistanceResult(SurveyResult):
+    # metres from the requested grid reference
+    distance: float
+
+
+class SiteDistanceResult(SiteResult):
+    # metres to the site's closest survey
+    distance: float
+
+
+class SiteSearchResult(SiteResult):
+    score: float
+
+
+class SpeciesSearchResult(SpeciesResult):
+    score: float
+
+
+class YearlyCount(BaseModel):
+    species_id: int
+    event_date_year: int
+    # only set when grouped by=site / by=water_body
+    area_id: Optional[str] = None
+    geo_water_body: Optional[str] = None
+    total_count: Optional[int]
+    survey_count: int
+
+
+class SiteBatchResult(BaseModel):
+    data: List[SiteResult]
+    missing: List[str]
+
+
+class SpeciesBatchResult(BaseModel):
+    data: List[SpeciesResult]
+    missing: List[int]
+
+
+class SurveyBatchResult(BaseModel):
+    data: List[SurveyResult]
+    missing: List[uuid.UUID]
@@ -1,53 +1,233 @@
-from typing import List
+from typing import List, Optional
 
 from dotenv import dotenv_values
+from fastapi import Response
 from fastapi.exceptions import HTTPException
-from sqlalchemy import Integer, func
+from sqlalchemy import Select, delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from src.fish.db.engine import DBSession, init_db
-from src.fish.db.models import DBSites, DBSpecies, DBSurvey
-from src.fish.operations.output_models import SiteResult, SpeciesBySite
+from src.fish.db.models import (
+    SITE_SEARCH_TEXT,
+    SURVEY_GEOM,
+    DBSites,
+    DBSiteSpeciesSummary,
+    DBSpecies,
+    DBSurvey,
+)
+from src.fish.operations.output_models import (
+    SiteBatchResult,
+    SiteDistanceResult,
+    SiteResult,
+    SiteSearchResult,
+    SpeciesBySite,
+)
 from src.fish.utils.query_builder import (
-    convert_sql_obj_to_dict,
-    get_all,
+    build_grid_point,
+    build_search_statement,
     get_item_by_id,
+    get_item_by_id_async,
+    get_items_by_ids,
+    get_items_by_ids_async,
+    get_page_results,
+    get_page_results_async,
+    get_page_rows,
+    get_page_rows_async,
+    result_model_columns,
+    set_next_cursor,
 )
+from src.fish.utils.operation_cache import cached_operation, invalidate_caches
+from src.fish.utils.serialization import build_fast_response
+
+
+def get_all_sites(
+    db: Session, skip: int, limit: int, cursor: Optional[str] = None
+) -> List[SiteResult]:
+    return get_page_results(db, DBSites, SiteResult, skip, limit, cursor)
+
+
+async def get_all_sites_async(
+    db: AsyncSession, skip: int, limit: int, cursor: Optional[str] = None
+) -> List[SiteResult]:
+    return await get_page_results_async(db, DBSites, SiteResult, skip, limit, cursor)
+
 
+def get_all_sites_fast(
+    db: Session, skip: int, limit: int, cursor: Optional[str] = None
+) -> Response:
+    columns = result_model_columns(DBSites, SiteResult)
+    rows = get_page_rows(db, DBSites, skip, limit, cursor, columns)
+    response = build_fast_response(rows, DBSites, SiteResult)
+    set_next_cursor(response, rows, limit, cursor)
+    return response
 
-def get_all_sites(db: Session, skip: int, limit: int) -> List[SiteResult]:
-    sites = get_all(db, DBSites, skip, limit)
-    return [SiteResult(**convert_sql_obj_to_dict(site)) for site in sites]
 
+async def get_all_sites_fast_async(
+    db: AsyncSession, skip: int, limit: int, cursor: Optional[str] = None
+) -> Response:
+    columns = result_model_columns(DBSites, SiteResult)
+    rows = await get_page_rows_async(db, DBSites, skip, limit, cursor, columns)
+    response = build_fast_response(rows, DBSites, SiteResult)
+    set_next_cursor(response, rows, limit, cursor)
+    return response
 
+
+@cached_operation
 def get_sites_by_id(db: Session, id: str) -> SiteResult:
     return get_item_by_id(db, id, DBSites, SiteResult)
 
 
-def get_species_for_a_site(db: Session, id: str):
+@cached_operation
+async def get_sites_by_id_async(db: AsyncSession, id: str) -> SiteResult:
+    return await get_item_by_id_async(db, id, DBSites, SiteResult)
+
+
+def get_sites_by_ids(db: Session, ids: List[str]) -> SiteBatchResult:
+    data, missing = get_items_by_ids(db, ids, DBSites, SiteResult)
+    return SiteBatchResult(data=data, missing=missing)
+
+
+async def get_sites_by_ids_async(db: AsyncSession, ids: List[str]) -> SiteBatchResult:
+    data, missing = await get_items_by_ids_async(db, ids, DBSites, SiteResult)
+    return SiteBatchResult(data=data, missing=missing)
+
+
+def site_species_summary_query_builder(area_ids: Optional[List[str]] = None) -> Select:
     max_func = func.max(DBSurvey.event_date_year).label("newest_year_recorded")
     min_func = func.min(DBSurvey.event_date_year).label("oldest_year_recorded")
-    fish_count_converted = func.sum(func.nullif(DBSurvey.fish_count, "").cast(Integer))
-    return (
-        db.query(
-            DBSpecies.species_name,
+    statement = (
+        select(
+            DBSurvey.area_id,
+            DBSurvey.species_id,
             max_func,
             min_func,
-            fish_count_converted.label("total_count"),
+            func.sum(DBSurvey.fish_count).label("total_count"),
+        )
+        .filter(DBSurvey.area_id.is_not(None), DBSurvey.species_id.is_not(None))
+        .group_by(DBSurvey.area_id, DBSurvey.species_id)
+    )
+    if area_ids is not None:
+        statement = statement.filter(DBSurvey.area_id.in_(area_ids))
+    return statement
+
+
+def refresh_site_species_summary(
+    db: Session, area_ids: Optional[List[str]] = None, commit: bool = True
+):
+    # full (or per-site) rebuild; routine inserts are folded in by the db trigger
+    clear = delete(DBSiteSpeciesSummary)
+    if area_ids is not None:
+        clear = clear.filter(DBSiteSpeciesSummary.area_id.in_(area_ids))
+    db.execute(clear)
+    db.execute(
+        insert(DBSiteSpeciesSummary).from_select(
+            [
+                "area_id",
+                "species_id",
+                "newest_year_recorded",
+                "oldest_year_recorded",
+                "total_count",
+            ],
+            site_species_summary_query_builder(area_ids),
+        )
+    )
+    if commit:
+        db.commit()
+        invalidate_caches()
+
+
+def species_for_a_site_query_builder(id: str) -> Select:
+    return (
+        select(
+            DBSpecies.species_name,
+            DBSiteSpeciesSummary.newest_year_recorded,
+            DBSiteSpeciesSummary.oldest_year_recorded,
+            DBSiteSpeciesSummary.total_count,
         )
-        .join(DBSurvey, onclause=DBSurvey.species_id == DBSpecies.id)
-        .join(DBSites, onclause=DBSurvey.area_id == DBSites.id)
-        .filter(DBSurvey.area_id == id)
-        .group_by(DBSpecies.species_name)
-        .order_by(fish_count_converted.desc())
-        .all()
+        .join(DBSpecies, onclause=DBSiteSpeciesSummary.species_id == DBSpecies.id)
+        .filter(DBSiteSpeciesSummary.area_id == id)
+        .order_by(DBSiteSpeciesSummary.total_count.desc())
     )
 
 
-def get_fish_species_for_a_site(db: Session, id: str):
-    site_species = get_species_for_a_site(db, id)
+def get_species_for_a_site(db: Session, id: str):
+    return db.execute(species_for_a_site_query_builder(id)).all()
+
+
+async def get_species_for_a_site_async(db: AsyncSession, id: str):
+    result = await db.execute(species_for_a_site_query_builder(id))
+    return result.all()
+
+
+def build_species_by_site_results(id: str, site_species) -> List[SpeciesBySite]:
     if not site_species:
         raise HTTPException(
             status_code=404, detail=f"unable to get species with site id of {id}"
         )
-    return [SpeciesBySite(**convert_sql_obj_to_dict(res)) for res in site_species]
+    return [SpeciesBySite(**res._mapping) for res in site_species]
+
+
+@cached_operation
+def get_fish_species_for_a_site(db: Session, id: str) -> List[SpeciesBySite]:
+    return build_species_by_site_results(id, get_species_for_a_site(db, id))
+
+
+@cached_operation
+async def get_fish_species_for_a_site_async(
+    db: AsyncSession, id: str
+) -> List[SpeciesBySite]:
+    site_species = await get_species_for_a_site_async(db, id)
+    return build_species_by_site_results(id, site_species)
+
+
+def sites_within_radius_query_builder(
+    easting: float, northing: float, radius: float, limit: int
+) -> Select:
+    # sites have no location of their own, they are as close as their surveys
+    point = build_grid_point(easting, northing)
+    near = (
+        select(
+            DBSurvey.area_id,
+            func.min(func.ST_Distance(SURVEY_GEOM, point)).label("distance"),
+        )
+        .where(func.ST_DWithin(SURVEY_GEOM, point, radius))
+        .group_by(DBSurvey.area_id)
+        .subquery()
+    )
+    return (
+        select(*result_model_columns(DBSites, SiteResult), near.c.distance)
+        .join(near, near.c.area_id == DBSites.id)
+        .order_by(near.c.distance)
+        .limit(limit)
+    )
+
+
+def get_sites_within_radius(
+    db: Session, easting: float, northing: float, radius: float, limit: int
+) -> List[SiteDistanceResult]:
+    statement = sites_within_radius_query_builder(easting, northing, radius, limit)
+    return [SiteDistanceResult(**row._mapping) for row in db.execute(statement)]
+
+
+async def get_sites_within_radius_async(
+    db: AsyncSession, easting: float, northing: float, radius: float, limit: int
+) -> List[SiteDistanceResult]:
+    statement = sites_within_radius_query_builder(easting, northing, radius, limit)
+    result = await db.execute(statement)
+    return [SiteDistanceResult(**row._mapping) for row in result]
+
+
+@cached_operation
+def search_sites(db: Session, q: str, limit: int) -> List[SiteSearchResult]:
+    statement = build_search_statement(DBSites, SiteResult, SITE_SEARCH_TEXT, q, limit)
+    return [SiteSearchResult(**row._mapping) for row in db.execute(statement)]
+
+
+@cached_operation
+async def search_sites_async(
+    db: AsyncSession, q: str, limit: int
+) -> List[SiteSearchResult]:
+    statement = build_search_statement(DBSites, SiteResult, SITE_SEARCH_TEXT, q, limit)
+    result = await db.execute(statement)
+    return [SiteSearchResult(**row._mapping) for row in result]
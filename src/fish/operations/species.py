@@ -1,75 +1,222 @@
-from typing import List
+from typing import List, Optional, Tuple
 
+from fastapi import Response
 from fastapi.exceptions import HTTPException
-from sqlalchemy.orm import Query, Session
-
-from src.fish.db.models import Base, DBSites, DBSpecies, DBSurvey
-from src.fish.operations.output_models import SiteBySpecies, SpeciesResult
+from sqlalchemy import Row, Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from src.fish.db.models import SPECIES_SEARCH_TEXT, Base, DBSites, DBSpecies, DBSurvey
+from src.fish.operations.output_models import (
+    SiteBySpecies,
+    SpeciesBatchResult,
+    SpeciesResult,
+    SpeciesSearchResult,
+)
 from src.fish.utils.query_builder import (
-    convert_sql_obj_to_dict,
-    get_all,
+    build_search_statement,
     get_item_by_id,
+    get_item_by_id_async,
+    get_items_by_ids,
+    get_items_by_ids_async,
+    get_page_results,
+    get_page_results_async,
+    get_page_rows,
+    get_page_rows_async,
+    result_model_columns,
+    set_next_cursor,
 )
+from src.fish.utils.operation_cache import cached_operation
+from src.fish.utils.serialization import build_fast_response
+
+
+@cached_operation
+def get_all_species(
+    db: Session, limit: int, skip: int, cursor: Optional[str] = None
+) -> List[SpeciesResult]:
+    return get_page_results(db, DBSpecies, SpeciesResult, skip, limit, cursor)
+
+
+@cached_operation
+async def get_all_species_async(
+    db: AsyncSession, limit: int, skip: int, cursor: Optional[str] = None
+) -> List[SpeciesResult]:
+    return await get_page_results_async(
+        db, DBSpecies, SpeciesResult, skip, limit, cursor
+    )
+
+
+@cached_operation
+def get_species_page_rows(
+    db: Session, limit: int, skip: int, cursor: Optional[str] = None
+) -> List[Row]:
+    columns = result_model_columns(DBSpecies, SpeciesResult)
+    return get_page_rows(db, DBSpecies, skip, limit, cursor, columns)
+
+
+@cached_operation
+async def get_species_page_rows_async(
+    db: AsyncSession, limit: int, skip: int, cursor: Optional[str] = None
+) -> List[Row]:
+    columns = result_model_columns(DBSpecies, SpeciesResult)
+    return await get_page_rows_async(db, DBSpecies, skip, limit, cursor, columns)
 
 
-def get_all_species(db: Session, limit: int, skip: int) -> List[SpeciesResult]:
-    species = get_all(db, DBSpecies, skip, limit)
-    print(species)
-    return [SpeciesResult(**convert_sql_obj_to_dict(row)) for row in species]
+# the rows are cached rather than the response, a Response is mutable and
+# picks up per-request state (headers, background tasks)
+def get_all_species_fast(
+    db: Session, limit: int, skip: int, cursor: Optional[str] = None
+) -> Response:
+    rows = get_species_page_rows(db, limit, skip, cursor)
+    response = build_fast_response(rows, DBSpecies, SpeciesResult)
+    set_next_cursor(response, rows, limit, cursor)
+    return response
 
 
+async def get_all_species_fast_async(
+    db: AsyncSession, limit: int, skip: int, cursor: Optional[str] = None
+) -> Response:
+    rows = await get_species_page_rows_async(db, limit, skip, cursor)
+    response = build_fast_response(rows, DBSpecies, SpeciesResult)
+    set_next_cursor(response, rows, limit, cursor)
+    return response
+
+
+@cached_operation
 def get_species_by_id(db: Session, id: int) -> SpeciesResult:
     return get_item_by_id(db, id, DBSpecies, SpeciesResult)
 
 
-def retrieve_area_by_species_query_builder(id: int, db: Session) -> Query:
-    return (
-        db.query(
-            DBSites.id,
-            DBSites.top_tier_site,
-            DBSites.site_parent_name,
-            DBSites.site_name,
-        )
-        .join(DBSurvey, onclause=DBSites.id == DBSurvey.area_id)
-        .join(DBSpecies, onclause=DBSurvey.species_id == DBSpecies.id)
-        .filter(DBSpecies.id == id)
-        .group_by(
-            DBSites.id,
-            DBSites.top_tier_site,
-            DBSites.site_parent_name,
-            DBSites.site_name,
-        )
+@cached_operation
+async def get_species_by_id_async(db: AsyncSession, id: int) -> SpeciesResult:
+    return await get_item_by_id_async(db, id, DBSpecies, SpeciesResult)
+
+
+def get_species_by_ids(db: Session, ids: List[int]) -> SpeciesBatchResult:
+    data, missing = get_items_by_ids(db, ids, DBSpecies, SpeciesResult)
+    return SpeciesBatchResult(data=data, missing=missing)
+
+
+async def get_species_by_ids_async(
+    db: AsyncSession, ids: List[int]
+) -> SpeciesBatchResult:
+    data, missing = await get_items_by_ids_async(db, ids, DBSpecies, SpeciesResult)
+    return SpeciesBatchResult(data=data, missing=missing)
+
+
+def retrieve_area_by_species_query_builder(id: int) -> Select:
+    # a semi-join stops at the first matching survey per site, rather than
+    # joining every survey (and the species row) and grouping them back down
+    surveyed = select(DBSurvey.area_id).where(
+        DBSurvey.species_id == id, DBSurvey.area_id == DBSites.id
     )
+    return select(
+        DBSites.id,
+        DBSites.top_tier_site,
+        DBSites.site_parent_name,
+        DBSites.site_name,
+    ).where(surveyed.exists())
+
+
+def sites_by_species_id_count_query_builder(id: int) -> Select:
+    area_by_species = retrieve_area_by_species_query_builder(id).subquery()
+    return select(func.count()).select_from(area_by_species)
 
 
 def get_sites_by_species_id_count(db: Session, id: int) -> int:
-    return retrieve_area_by_species_query_builder(id, db).count()
+    return db.scalar(sites_by_species_id_count_query_builder(id))
 
 
-def get_sites_by_species_id(db: Session, id: int, limit: int, skip: int):
+def sites_by_species_page_query_builder(id: int, limit: int, skip: int) -> Select:
+    # the window count is taken before offset/limit, so every row of the page
+    # carries the full total and no second count query is needed
+    total_count = func.count().over().label("total_count")
     return (
-        retrieve_area_by_species_query_builder(id, db).offset(skip).limit(limit).all()
+        retrieve_area_by_species_query_builder(id)
+        .add_columns(total_count)
+        .order_by(DBSites.id)
+        .offset(skip)
+        .limit(limit)
     )
 
 
-def get_fish_sites_for_a_species(
-    db: Session, id: int, limit: int, skip: int
-) -> List[SiteBySpecies]:
-    site_count = get_sites_by_species_id_count(db, id)
+def get_sites_by_species_id(db: Session, id: int, limit: int, skip: int):
+    statement = sites_by_species_page_query_builder(id, limit, skip)
+    return db.execute(statement).all()
+
+
+async def get_sites_by_species_id_async(
+    db: AsyncSession, id: int, limit: int, skip: int
+):
+    statement = sites_by_species_page_query_builder(id, limit, skip)
+    result = await db.execute(statement)
+    return result.all()
+
+
+def validate_sites_by_species_page(limit: int, skip: int):
+    # checked before the page query, postgres errors on a negative OFFSET
     if not 0 <= limit <= 100:
         raise HTTPException(
             status_code=404, detail=f"limit of {limit} exceeds max limit of 100"
         )
+    if skip < 0:
+        raise HTTPException(status_code=404, detail=f"skip of {skip} is below 0")
+
 
+def validate_sites_by_species_skip(skip: int, site_count: int):
     if not 0 <= skip <= site_count:
         raise HTTPException(
             status_code=404,
             detail=f"skip of {skip} exceeds total count of {site_count}",
         )
 
-    site_species = get_sites_by_species_id(db, id, limit, skip)
+
+def build_sites_by_species_results(id: int, site_species) -> List[SiteBySpecies]:
     if not site_species:
         raise HTTPException(
             status_code=404, detail=f"unable to result with species id of {id}"
         )
     return [SiteBySpecies(**dict(res._mapping)) for res in site_species]
+
+
+def get_fish_sites_for_a_species(
+    db: Session, id: int, limit: int, skip: int
+) -> Tuple[List[SiteBySpecies], int]:
+    validate_sites_by_species_page(limit, skip)
+    site_species = get_sites_by_species_id(db, id, limit, skip)
+    if not site_species and skip:
+        # paged past the end, only now is a separate count worth running
+        validate_sites_by_species_skip(skip, get_sites_by_species_id_count(db, id))
+    results = build_sites_by_species_results(id, site_species)
+    return results, site_species[0].total_count
+
+
+async def get_fish_sites_for_a_species_async(
+    db: AsyncSession, id: int, limit: int, skip: int
+) -> Tuple[List[SiteBySpecies], int]:
+    validate_sites_by_species_page(limit, skip)
+    site_species = await get_sites_by_species_id_async(db, id, limit, skip)
+    if not site_species and skip:
+        site_count = await db.scalar(sites_by_species_id_count_query_builder(id))
+        validate_sites_by_species_skip(skip, site_count)
+    results = build_sites_by_species_results(id, site_species)
+    return results, site_species[0].total_count
+
+
+@cached_operation
+def search_species(db: Session, q: str, limit: int) -> List[SpeciesSearchResult]:
+    statement = build_search_statement(
+        DBSpecies, SpeciesResult, SPECIES_SEARCH_TEXT, q, limit
+    )
+    return [SpeciesSearchResult(**row._mapping) for row in db.execute(statement)]
+
+
+@cached_operation
+async def search_species_async(
+    db: AsyncSession, q: str, limit: int
+) -> List[SpeciesSearchResult]:
+    statement = build_search_statement(
+        DBSpecies, SpeciesResult, SPECIES_SEARCH_TEXT, q, limit
+    )
+    result = await db.execute(statement)
+    return [SpeciesSearchResult(**row._mapping) for row in result]
@@ -1,21 +1,331 @@
 import uuid
-from typing import List
+from typing import List, Optional
 
-from sqlalchemy.orm import Session
+from fastapi import HTTPException, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import ColumnElement, Row, Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 
-from src.fish.db.models import DBSurvey
-from src.fish.operations.output_models import SurveyResult
+from src.fish.db.models import SURVEY_GEOM, DBSurvey
+from src.fish.operations.input_models import SurveyFilters
+from src.fish.operations.output_models import (
+    ExpandedSurveyResult,
+    SurveyBatchResult,
+    SurveyDistanceResult,
+    SurveyResult,
+)
 from src.fish.utils.query_builder import (
-    convert_sql_obj_to_dict,
-    get_all,
     get_item_by_id,
+    build_filtered_count_statement,
+    stored_id_forms,
+    build_grid_point,
+    build_page_statement,
+    get_item_by_id_async,
+    get_items_by_ids,
+    get_items_by_ids_async,
+    get_page_results,
+    get_page_results_async,
+    get_page_rows,
+    get_page_rows_async,
+    result_model_columns,
+    set_next_cursor,
+)
+from src.fish.utils.serialization import (
+    EXPORT_MEDIA_TYPES,
+    ExportFormat,
+    build_fast_response,
+    build_row_converters,
+    encode_export_rows,
+    rows_to_csv,
 )
 
+EXPORT_BATCH_SIZE = 1000
+EXPANDABLE = {"species": DBSurvey.species, "area": DBSurvey.area}
+
+
+def build_survey_filters(filters: Optional[SurveyFilters]) -> List[ColumnElement]:
+    if filters is None:
+        return []
+    clauses = []
+    bounds = (
+        (DBSurvey.event_date_year, filters.year_from, filters.year_to),
+        (DBSurvey.survey_ranked_easting, filters.min_easting, filters.max_easting),
+        (DBSurvey.survey_ranked_northing, filters.min_northing, filters.max_northing),
+    )
+    for column, lower, upper in bounds:
+        if lower is not None:
+            clauses.append(column >= lower)
+        if upper is not None:
+            clauses.append(column <= upper)
+    if filters.species_id is not None:
+        clauses.append(DBSurvey.species_id == filters.species_id)
+    if filters.area_id is not None:
+        # area ids are served dashed but stored as bare hex
+        clauses.append(DBSurvey.area_id.in_(stored_id_forms(filters.area_id)))
+    return clauses
+
+
+def count_surveys(db: Session, filters: Optional[SurveyFilters]) -> Optional[int]:
+    # unfiltered pages keep using the middleware's cached table count
+    clauses = build_survey_filters(filters)
+    if not clauses:
+        return None
+    return db.execute(build_filtered_count_statement(DBSurvey, clauses)).scalar()
+
+
+async def count_surveys_async(
+    db: AsyncSession, filters: Optional[SurveyFilters]
+) -> Optional[int]:
+    clauses = build_survey_filters(filters)
+    if not clauses:
+        return None
+    result = await db.execute(build_filtered_count_statement(DBSurvey, clauses))
+    return result.scalar()
+
+
+def get_all_surveys(
+    db: Session,
+    limit: int,
+    skip: int,
+    cursor: Optional[str] = None,
+    filters: Optional[SurveyFilters] = None,
+) -> List[SurveyResult]:
+    return get_page_results(
+        db, DBSurvey, SurveyResult, skip, limit, cursor, build_survey_filters(filters)
+    )
+
+
+async def get_all_surveys_async(
+    db: AsyncSession,
+    limit: int,
+    skip: int,
+    cursor: Optional[str] = None,
+    filters: Optional[SurveyFilters] = None,
+) -> List[SurveyResult]:
+    return await get_page_results_async(
+        db, DBSurvey, SurveyResult, skip, limit, cursor, build_survey_filters(filters)
+    )
+
+
+def get_all_surveys_fast(
+    db: Session,
+    limit: int,
+    skip: int,
+    cursor: Optional[str] = None,
+    filters: Optional[SurveyFilters] = None,
+) -> Response:
+    columns = result_model_columns(DBSurvey, SurveyResult)
+    clauses = build_survey_filters(filters)
+    rows = get_page_rows(db, DBSurvey, skip, limit, cursor, columns, clauses)
+    response = build_fast_response(rows, DBSurvey, SurveyResult)
+    set_next_cursor(response, rows, limit, cursor)
+    return response
+
 
-def get_all_surveys(db: Session, limit: int, skip: int) -> List[SurveyResult]:
-    surveys = get_all(db, DBSurvey, skip, limit)
-    return [SurveyResult(**convert_sql_obj_to_dict(survey)) for survey in surveys]
+async def get_all_surveys_fast_async(
+    db: AsyncSession,
+    limit: int,
+    skip: int,
+    cursor: Optional[str] = None,
+    filters: Optional[SurveyFilters] = None,
+) -> Response:
+    columns = result_model_columns(DBSurvey, SurveyResult)
+    clauses = build_survey_filters(filters)
+    rows = await get_page_rows_async(
+        db, DBSurvey, skip, limit, cursor, columns, clauses
+    )
+    response = build_fast_response(rows, DBSurvey, SurveyResult)
+    set_next_cursor(response, rows, limit, cursor)
+    return response
+
+
+def parse_expand(expand: str) -> List[str]:
+    names = [name.strip() for name in expand.split(",") if name.strip()]
+    unknown = set(names) - set(EXPANDABLE)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unable to expand {sorted(unknown)}, expected {sorted(EXPANDABLE)}",
+        )
+    return list(dict.fromkeys(names))
+
+
+def build_expanded_statement(
+    limit: int,
+    skip: int,
+    cursor: Optional[str],
+    expand: List[str],
+    filters: Optional[SurveyFilters] = None,
+) -> Select:
+    # one IN query per relationship for the whole page, never a lazy load per row
+    options = [selectinload(EXPANDABLE[name]) for name in expand]
+    statement = build_page_statement(
+        DBSurvey, skip, limit, cursor, filters=build_survey_filters(filters)
+    )
+    return statement.options(*options)
+
+
+def build_expanded_results(
+    surveys: List[DBSurvey], expand: List[str]
+) -> List[ExpandedSurveyResult]:
+    names = list(SurveyResult.model_fields) + expand
+    return [
+        ExpandedSurveyResult.model_validate(
+            {name: getattr(survey, name) for name in names}, from_attributes=True
+        )
+        for survey in surveys
+    ]
+
+
+def get_all_surveys_expanded(
+    db: Session,
+    limit: int,
+    skip: int,
+    cursor: Optional[str],
+    expand: List[str],
+    filters: Optional[SurveyFilters] = None,
+) -> List[ExpandedSurveyResult]:
+    statement = build_expanded_statement(limit, skip, cursor, expand, filters)
+    return build_expanded_results(db.execute(statement).scalars().all(), expand)
+
+
+async def get_all_surveys_expanded_async(
+    db: AsyncSession,
+    limit: int,
+    skip: int,
+    cursor: Optional[str],
+    expand: List[str],
+    filters: Optional[SurveyFilters] = None,
+) -> List[ExpandedSurveyResult]:
+    statement = build_expanded_statement(limit, skip, cursor, expand, filters)
+    result = await db.execute(statement)
+    return build_expanded_results(result.scalars().all(), expand)
 
 
 def get_survey_by_id(db: Session, id: uuid.UUID) -> SurveyResult:
     return get_item_by_id(db, id, DBSurvey, SurveyResult)
+
+
+async def get_survey_by_id_async(db: AsyncSession, id: uuid.UUID) -> SurveyResult:
+    return await get_item_by_id_async(db, id, DBSurvey, SurveyResult)
+
+
+def get_surveys_by_ids(db: Session, ids: List[uuid.UUID]) -> SurveyBatchResult:
+    data, missing = get_items_by_ids(db, ids, DBSurvey, SurveyResult)
+    return SurveyBatchResult(data=data, missing=missing)
+
+
+async def get_surveys_by_ids_async(
+    db: AsyncSession, ids: List[uuid.UUID]
+) -> SurveyBatchResult:
+    data, missing = await get_items_by_ids_async(db, ids, DBSurvey, SurveyResult)
+    return SurveyBatchResult(data=data, missing=missing)
+
+
+def build_export_statement(filters: Optional[SurveyFilters] = None) -> Select:
+    # yield_per turns on stream_results, i.e. a server side cursor on postgres
+    columns = result_model_columns(DBSurvey, SurveyResult)
+    return (
+        select(*columns)
+        .where(*build_survey_filters(filters))
+        .order_by(DBSurvey.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+
+
+def build_export_response(chunks, format: ExportFormat) -> StreamingResponse:
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"content-disposition": f'attachment; filename="surveys.{format}"'},
+    )
+
+
+def export_surveys(
+    db: Session, format: ExportFormat, filters: Optional[SurveyFilters] = None
+) -> StreamingResponse:
+    converters = build_row_converters(DBSurvey, SurveyResult)
+    result = db.execute(build_export_statement(filters))
+
+    def chunks():
+        if format == "csv":
+            yield rows_to_csv([], converters, header=True)
+        for rows in result.partitions():
+            yield encode_export_rows(rows, converters, format)
+
+    return build_export_response(chunks(), format)
+
+
+async def export_surveys_async(
+    db: AsyncSession, format: ExportFormat, filters: Optional[SurveyFilters] = None
+) -> StreamingResponse:
+    converters = build_row_converters(DBSurvey, SurveyResult)
+    result = await db.stream(build_export_statement(filters))
+
+    async def chunks():
+        if format == "csv":
+            yield rows_to_csv([], converters, header=True)
+        async for rows in result.partitions():
+            yield encode_export_rows(rows, converters, format)
+
+    return build_export_response(chunks(), format)
+
+
+def surveys_within_radius_query_builder(
+    easting: float, northing: float, radius: float, limit: int
+) -> Select:
+    # ST_DWithin is what lets the gist index on geom prune the search
+    point = build_grid_point(easting, northing)
+    distance = func.ST_Distance(SURVEY_GEOM, point).label("distance")
+    return (
+        select(*result_model_columns(DBSurvey, SurveyResult), distance)
+        .where(func.ST_DWithin(SURVEY_GEOM, point, radius))
+        .order_by(distance)
+        .limit(limit)
+    )
+
+
+def nearest_surveys_query_builder(easting: float, northing: float, k: int) -> Select:
+    # ordering on <-> is answered by walking the gist index, nearest first
+    point = build_grid_point(easting, northing)
+    distance = SURVEY_GEOM.op("<->")(point).label("distance")
+    return (
+        select(*result_model_columns(DBSurvey, SurveyResult), distance)
+        .order_by(distance)
+        .limit(k)
+    )
+
+
+def build_survey_distance_results(rows: List[Row]) -> List[SurveyDistanceResult]:
+    return [SurveyDistanceResult(**row._mapping) for row in rows]
+
+
+def get_surveys_within_radius(
+    db: Session, easting: float, northing: float, radius: float, limit: int
+) -> List[SurveyDistanceResult]:
+    statement = surveys_within_radius_query_builder(easting, northing, radius, limit)
+    return build_survey_distance_results(db.execute(statement).all())
+
+
+async def get_surveys_within_radius_async(
+    db: AsyncSession, easting: float, northing: float, radius: float, limit: int
+) -> List[SurveyDistanceResult]:
+    statement = surveys_within_radius_query_builder(easting, northing, radius, limit)
+    result = await db.execute(statement)
+    return build_survey_distance_results(result.all())
+
+
+def get_nearest_surveys(
+    db: Session, easting: float, northing: float, k: int
+) -> List[SurveyDistanceResult]:
+    statement = nearest_surveys_query_builder(easting, northing, k)
+    return build_survey_distance_results(db.execute(statement).all())
+
+
+async def get_nearest_surveys_async(
+    db: AsyncSession, easting: float, northing: float, k: int
+) -> List[SurveyDistanceResult]:
+    statement = nearest_surveys_query_builder(easting, northing, k)
+    result = await db.execute(statement)
+    return build_survey_distance_results(result.all())
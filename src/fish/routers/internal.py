@@ -0,0 +1,59 @@
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+
+from src.fish.db.engine import get_pool_statuses
+from src.fish.middleware import COUNT_CACHE
+from src.fish.utils.operation_cache import OPERATION_CACHE, invalidate_caches
+
+TOKEN_HEADER = "x-internal-token"
+
+
+class InternalSettings:
+    def __init__(self, token: Optional[str] = None):
+        self.token = token
+
+    def configure(self, settings: dict):
+        # unset (the default) turns the whole router off
+        self.token = settings.get("INTERNAL_TOKEN") or None
+
+
+INTERNAL = InternalSettings()
+
+
+def require_internal_token(
+    x_internal_token: Optional[str] = Header(default=None),
+):
+    if INTERNAL.token is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_internal_token is None or not hmac.compare_digest(
+        x_internal_token.encode(), INTERNAL.token.encode()
+    ):
+        raise HTTPException(status_code=403, detail="Invalid internal token")
+
+
+router = APIRouter(
+    prefix="/internal",
+    include_in_schema=False,
+    dependencies=[Depends(require_internal_token)],
+)
+
+
+@router.get("/pool")
+def api_get_pool_status() -> dict:
+    return get_pool_statuses()
+
+
+@router.get("/cache")
+def api_get_cache_stats() -> dict:
+    return OPERATION_CACHE.stats()
+
+
+@router.post("/cache/invalidate")
+def api_invalidate_cache() -> dict:
+    # also what the ingest cli calls after a load (--api-url). the caches are
+    # per process, so this only clears the worker that happens to handle it
+    invalidate_caches()
+    COUNT_CACHE.invalidate()
+    return OPERATION_CACHE.stats()
@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Response
+
+from src.fish.db.engine import get_pool_statuses
+from src.fish.utils.metrics import CONTENT_TYPE, render_metrics
+
+router = APIRouter(include_in_schema=False)
+
+
+@router.get("/metrics")
+def api_get_metrics() -> Response:
+    return Response(
+        content=render_metrics(get_pool_statuses()), media_type=CONTENT_TYPE
+    )
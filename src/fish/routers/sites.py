@@ -1,24 +1,83 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from src.fish.db.engine import get_db
-from src.fish.operations.output_models import SiteResult, SpeciesBySite
+from src.fish.db.engine import get_async_db, get_db
+from src.fish.middleware import MAX_LIMIT, MAX_RADIUS
+from src.fish.operations.input_models import SiteIds
+from src.fish.operations.output_models import (
+    SiteBatchResult,
+    SiteDistanceResult,
+    SiteResult,
+    SiteSearchResult,
+    SpeciesBySite,
+)
 from src.fish.operations.sites import (
     get_all_sites,
+    get_all_sites_async,
+    get_all_sites_fast,
+    get_all_sites_fast_async,
     get_fish_species_for_a_site,
+    get_fish_species_for_a_site_async,
     get_sites_by_id,
+    get_sites_by_id_async,
+    get_sites_by_ids,
+    get_sites_by_ids_async,
+    get_sites_within_radius,
+    get_sites_within_radius_async,
+    search_sites,
+    search_sites_async,
 )
+from src.fish.utils.query_builder import set_next_cursor
+from src.fish.utils.serialization import FAST_RESPONSES
 
 router = APIRouter()
+async_router = APIRouter()
 
 
 @router.get("/sites")
 def api_get_all_sites(
-    skip: int = 0, limit: int = 10, db: Session = Depends(get_db)
+    response: Response,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
 ) -> List[SiteResult]:
-    return get_all_sites(db, skip, limit)
+    if FAST_RESPONSES.enabled:
+        return get_all_sites_fast(db, skip, limit, cursor)
+    sites = get_all_sites(db, skip, limit, cursor)
+    set_next_cursor(response, sites, limit, cursor)
+    return sites
+
+
+@router.post("/sites:batchGet")
+def api_batch_get_sites(
+    body: SiteIds, db: Session = Depends(get_db)
+) -> SiteBatchResult:
+    return get_sites_by_ids(db, body.ids)
+
+
+@router.get("/sites/search")
+def api_search_sites(
+    q: str = Query(min_length=2),
+    limit: int = Query(10, ge=1, le=MAX_LIMIT),
+    db: Session = Depends(get_db),
+) -> List[SiteSearchResult]:
+    return search_sites(db, q, limit)
+
+
+# ahead of /sites/{id}, which would otherwise take "near" as a site id
+@router.get("/sites/near")
+def api_get_sites_near(
+    easting: float,
+    northing: float,
+    radius: float = Query(gt=0, le=MAX_RADIUS),
+    limit: int = Query(10, ge=1, le=MAX_LIMIT),
+    db: Session = Depends(get_db),
+) -> List[SiteDistanceResult]:
+    return get_sites_within_radius(db, easting, northing, radius, limit)
 
 
 @router.get("/sites/{id}")
@@ -31,3 +90,59 @@ def api_get_species_by_site(
     id: str, db: Session = Depends(get_db)
 ) -> List[SpeciesBySite]:
     return get_fish_species_for_a_site(db, id)
+
+
+@async_router.get("/sites")
+async def api_get_all_sites_async(
+    response: Response,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+) -> List[SiteResult]:
+    if FAST_RESPONSES.enabled:
+        return await get_all_sites_fast_async(db, skip, limit, cursor)
+    sites = await get_all_sites_async(db, skip, limit, cursor)
+    set_next_cursor(response, sites, limit, cursor)
+    return sites
+
+
+@async_router.post("/sites:batchGet")
+async def api_batch_get_sites_async(
+    body: SiteIds, db: AsyncSession = Depends(get_async_db)
+) -> SiteBatchResult:
+    return await get_sites_by_ids_async(db, body.ids)
+
+
+@async_router.get("/sites/search")
+async def api_search_sites_async(
+    q: str = Query(min_length=2),
+    limit: int = Query(10, ge=1, le=MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_db),
+) -> List[SiteSearchResult]:
+    return await search_sites_async(db, q, limit)
+
+
+@async_router.get("/sites/near")
+async def api_get_sites_near_async(
+    easting: float,
+    northing: float,
+    radius: float = Query(gt=0, le=MAX_RADIUS),
+    limit: int = Query(10, ge=1, le=MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_db),
+) -> List[SiteDistanceResult]:
+    return await get_sites_within_radius_async(db, easting, northing, radius, limit)
+
+
+@async_router.get("/sites/{id}")
+async def api_get_sites_by_id_async(
+    id: str, db: AsyncSession = Depends(get_async_db)
+) -> SiteResult:
+    return await get_sites_by_id_async(db, id)
+
+
+@async_router.get("/sites/{id}/species")
+async def api_get_species_by_site_async(
+    id: str, db: AsyncSession = Depends(get_async_db)
+) -> List[SpeciesBySite]:
+    return await get_fish_species_for_a_site_async(db, id)
@@ -1,24 +1,68 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from src.fish.db.engine import get_db
-from src.fish.operations.output_models import SiteBySpecies, SpeciesResult
+from src.fish.db.engine import get_async_db, get_db
+from src.fish.middleware import MAX_LIMIT
+from src.fish.operations.input_models import SpeciesIds
+from src.fish.operations.output_models import (
+    SiteBySpecies,
+    SpeciesBatchResult,
+    SpeciesResult,
+    SpeciesSearchResult,
+)
 from src.fish.operations.species import (
     get_all_species,
+    get_all_species_async,
+    get_all_species_fast,
+    get_all_species_fast_async,
     get_fish_sites_for_a_species,
+    get_fish_sites_for_a_species_async,
     get_species_by_id,
+    get_species_by_id_async,
+    get_species_by_ids,
+    get_species_by_ids_async,
+    search_species,
+    search_species_async,
 )
+from src.fish.utils.query_builder import set_next_cursor, set_total_count
+from src.fish.utils.serialization import FAST_RESPONSES
 
 router = APIRouter()
+async_router = APIRouter()
 
 
 @router.get("/species")
 def api_get_all_species(
-    skip: int = 0, limit: int = 10, db: Session = Depends(get_db)
+    response: Response,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
 ) -> List[SpeciesResult]:
-    return get_all_species(db, limit, skip)
+    if FAST_RESPONSES.enabled:
+        return get_all_species_fast(db, limit, skip, cursor)
+    species = get_all_species(db, limit, skip, cursor)
+    set_next_cursor(response, species, limit, cursor)
+    return species
+
+
+@router.post("/species:batchGet")
+def api_batch_get_species(
+    body: SpeciesIds, db: Session = Depends(get_db)
+) -> SpeciesBatchResult:
+    return get_species_by_ids(db, body.ids)
+
+
+@router.get("/species/search")
+def api_search_species(
+    q: str = Query(min_length=2),
+    limit: int = Query(10, ge=1, le=MAX_LIMIT),
+    db: Session = Depends(get_db),
+) -> List[SpeciesSearchResult]:
+    return search_species(db, q, limit)
 
 
 @router.get("/species/{id}")
@@ -28,6 +72,63 @@ def api_get_species_by_id(id: int, db: Session = Depends(get_db)) -> SpeciesResu
 
 @router.get("/species/{id}/sites")
 def api_get_species_for_sites(
-    id: int, limit: int = 10, skip: int = 0, db: Session = Depends(get_db)
+    response: Response,
+    id: int,
+    limit: int = 10,
+    skip: int = 0,
+    db: Session = Depends(get_db),
+) -> List[SiteBySpecies]:
+    sites, total_count = get_fish_sites_for_a_species(db, id, limit, skip)
+    set_total_count(response, total_count)
+    return sites
+
+
+@async_router.get("/species")
+async def api_get_all_species_async(
+    response: Response,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+) -> List[SpeciesResult]:
+    if FAST_RESPONSES.enabled:
+        return await get_all_species_fast_async(db, limit, skip, cursor)
+    species = await get_all_species_async(db, limit, skip, cursor)
+    set_next_cursor(response, species, limit, cursor)
+    return species
+
+
+@async_router.post("/species:batchGet")
+async def api_batch_get_species_async(
+    body: SpeciesIds, db: AsyncSession = Depends(get_async_db)
+) -> SpeciesBatchResult:
+    return await get_species_by_ids_async(db, body.ids)
+
+
+@async_router.get("/species/search")
+async def api_search_species_async(
+    q: str = Query(min_length=2),
+    limit: int = Query(10, ge=1, le=MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_db),
+) -> List[SpeciesSearchResult]:
+    return await search_species_async(db, q, limit)
+
+
+@async_router.get("/species/{id}")
+async def api_get_species_by_id_async(
+    id: int, db: AsyncSession = Depends(get_async_db)
+) -> SpeciesResult:
+    return await get_species_by_id_async(db, id)
+
+
+@async_router.get("/species/{id}/sites")
+async def api_get_species_for_sites_async(
+    response: Response,
+    id: int,
+    limit: int = 10,
+    skip: int = 0,
+    db: AsyncSession = Depends(get_async_db),
 ) -> List[SiteBySpecies]:
-    return get_fish_sites_for_a_species(db, id, limit, skip)
+    sites, total_count = await get_fish_sites_for_a_species_async(db, id, limit, skip)
+    set_total_count(response, total_count)
+    return sites
@@ -1,23 +1,212 @@
 import uuid
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from src.fish.db.engine import get_db
-from src.fish.operations.output_models import SurveyResult
-from src.fish.operations.surveys import get_all_surveys, get_survey_by_id
+from src.fish.db.engine import get_async_db, get_db
+from src.fish.middleware import MAX_LIMIT, MAX_RADIUS
+from src.fish.operations.aggregates import (
+    YearlyGrain,
+    get_yearly_counts,
+    get_yearly_counts_async,
+)
+from src.fish.operations.input_models import SurveyFilters, SurveyIds
+from src.fish.operations.output_models import (
+    ExpandedSurveyResult,
+    SurveyBatchResult,
+    SurveyDistanceResult,
+    SurveyResult,
+    YearlyCount,
+)
+from src.fish.operations.surveys import (
+    count_surveys,
+    count_surveys_async,
+    export_surveys,
+    export_surveys_async,
+    get_all_surveys,
+    get_all_surveys_async,
+    get_all_surveys_expanded,
+    get_all_surveys_expanded_async,
+    get_all_surveys_fast,
+    get_all_surveys_fast_async,
+    get_nearest_surveys,
+    get_nearest_surveys_async,
+    get_survey_by_id,
+    get_survey_by_id_async,
+    get_surveys_by_ids,
+    get_surveys_by_ids_async,
+    get_surveys_within_radius,
+    get_surveys_within_radius_async,
+    parse_expand,
+)
+from src.fish.utils.query_builder import set_next_cursor, set_total_count
+from src.fish.utils.serialization import FAST_RESPONSES, ExportFormat
 
 router = APIRouter()
+async_router = APIRouter()
 
 
-@router.get("/surveys")
+@router.get("/surveys", response_model_exclude_unset=True)
 def api_get_all_surveys(
-    limit: int = 10, skip: int = 0, db: Session = Depends(get_db)
-) -> List[SurveyResult]:
-    return get_all_surveys(db, limit, skip)
+    response: Response,
+    limit: int = 10,
+    skip: int = 0,
+    cursor: Optional[str] = None,
+    expand: Optional[str] = None,
+    filters: SurveyFilters = Depends(),
+    db: Session = Depends(get_db),
+) -> List[ExpandedSurveyResult]:
+    total_count = count_surveys(db, filters)
+    if expand:
+        surveys = get_all_surveys_expanded(
+            db, limit, skip, cursor, parse_expand(expand), filters
+        )
+    elif FAST_RESPONSES.enabled:
+        fast_response = get_all_surveys_fast(db, limit, skip, cursor, filters)
+        set_total_count(fast_response, total_count)
+        return fast_response
+    else:
+        surveys = get_all_surveys(db, limit, skip, cursor, filters)
+    set_next_cursor(response, surveys, limit, cursor)
+    set_total_count(response, total_count)
+    return surveys
+
+
+@router.get("/surveys/yearly", response_model_exclude_unset=True)
+def api_get_yearly_counts(
+    species_id: Optional[int] = None,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    by: Optional[YearlyGrain] = None,
+    db: Session = Depends(get_db),
+) -> List[YearlyCount]:
+    return get_yearly_counts(db, species_id, year_from, year_to, by)
+
+
+# declared ahead of /surveys/{id} so "export" isn't parsed as an id
+@router.get("/surveys/export")
+def api_export_surveys(
+    format: ExportFormat = "ndjson",
+    filters: SurveyFilters = Depends(),
+    db: Session = Depends(get_db),
+) -> StreamingResponse:
+    return export_surveys(db, format, filters)
+
+
+@router.post("/surveys:batchGet")
+def api_batch_get_surveys(
+    body: SurveyIds, db: Session = Depends(get_db)
+) -> SurveyBatchResult:
+    return get_surveys_by_ids(db, body.ids)
+
+
+@router.get("/surveys/near")
+def api_get_surveys_near(
+    easting: float,
+    northing: float,
+    radius: float = Query(gt=0, le=MAX_RADIUS),
+    limit: int = Query(10, ge=1, le=MAX_LIMIT),
+    db: Session = Depends(get_db),
+) -> List[SurveyDistanceResult]:
+    return get_surveys_within_radius(db, easting, northing, radius, limit)
+
+
+@router.get("/surveys/nearest")
+def api_get_nearest_surveys(
+    easting: float,
+    northing: float,
+    k: int = Query(10, ge=1, le=MAX_LIMIT),
+    db: Session = Depends(get_db),
+) -> List[SurveyDistanceResult]:
+    return get_nearest_surveys(db, easting, northing, k)
 
 
 @router.get("/surveys/{id}")
 def api_get_surveys_by_id(id: uuid.UUID, db: Session = Depends(get_db)) -> SurveyResult:
     return get_survey_by_id(db, id)
+
+
+@async_router.get("/surveys", response_model_exclude_unset=True)
+async def api_get_all_surveys_async(
+    response: Response,
+    limit: int = 10,
+    skip: int = 0,
+    cursor: Optional[str] = None,
+    expand: Optional[str] = None,
+    filters: SurveyFilters = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+) -> List[ExpandedSurveyResult]:
+    total_count = await count_surveys_async(db, filters)
+    if expand:
+        surveys = await get_all_surveys_expanded_async(
+            db, limit, skip, cursor, parse_expand(expand), filters
+        )
+    elif FAST_RESPONSES.enabled:
+        fast_response = await get_all_surveys_fast_async(
+            db, limit, skip, cursor, filters
+        )
+        set_total_count(fast_response, total_count)
+        return fast_response
+    else:
+        surveys = await get_all_surveys_async(db, limit, skip, cursor, filters)
+    set_next_cursor(response, surveys, limit, cursor)
+    set_total_count(response, total_count)
+    return surveys
+
+
+@async_router.get("/surveys/yearly", response_model_exclude_unset=True)
+async def api_get_yearly_counts_async(
+    species_id: Optional[int] = None,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    by: Optional[YearlyGrain] = None,
+    db: AsyncSession = Depends(get_async_db),
+) -> List[YearlyCount]:
+    return await get_yearly_counts_async(db, species_id, year_from, year_to, by)
+
+
+@async_router.get("/surveys/export")
+async def api_export_surveys_async(
+    format: ExportFormat = "ndjson",
+    filters: SurveyFilters = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+) -> StreamingResponse:
+    return await export_surveys_async(db, format, filters)
+
+
+@async_router.post("/surveys:batchGet")
+async def api_batch_get_surveys_async(
+    body: SurveyIds, db: AsyncSession = Depends(get_async_db)
+) -> SurveyBatchResult:
+    return await get_surveys_by_ids_async(db, body.ids)
+
+
+@async_router.get("/surveys/near")
+async def api_get_surveys_near_async(
+    easting: float,
+    northing: float,
+    radius: float = Query(gt=0, le=MAX_RADIUS),
+    limit: int = Query(10, ge=1, le=MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_db),
+) -> List[SurveyDistanceResult]:
+    return await get_surveys_within_radius_async(db, easting, northing, radius, limit)
+
+
+@async_router.get("/surveys/nearest")
+async def api_get_nearest_surveys_async(
+    easting: float,
+    northing: float,
+    k: int = Query(10, ge=1, le=MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_db),
+) -> List[SurveyDistanceResult]:
+    return await get_nearest_surveys_async(db, easting, northing, k)
+
+
+@async_router.get("/surveys/{id}")
+async def api_get_surveys_by_id_async(
+    id: uuid.UUID, db: AsyncSession = Depends(get_async_db)
+) -> SurveyResult:
+    return await get_survey_by_id_async(db, id)
@@ -0,0 +1,98 @@
+import gzip
+import zlib
+from typing import AsyncIterator, Callable, Dict, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # optional, responses fall back to gzip without it
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/csv")
+
+
+class CompressionSettings:
+    def __init__(
+        self,
+        enabled: bool = False,
+        min_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ):
+        self.enabled = enabled
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def configure(self, settings: dict):
+        self.enabled = settings.get("COMPRESSION", "false").lower() == "true"
+        self.min_size = int(settings.get("COMPRESSION_MIN_SIZE", 1024))
+        self.gzip_level = int(settings.get("COMPRESSION_GZIP_LEVEL", 6))
+        # high qualities are far too slow for per-request brotli
+        self.brotli_quality = int(settings.get("COMPRESSION_BROTLI_QUALITY", 4))
+
+
+COMPRESSION = CompressionSettings()
+
+
+def available_encodings() -> Tuple[str, ...]:
+    # in order of preference when the client weights them equally
+    if brotli is not None:
+        return ("br", "gzip")
+    return ("gzip",)
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate_encoding(header: Optional[str]) -> Optional[str]:
+    if not header:
+        return None
+    accepted = parse_accept_encoding(header)
+    best, best_q = None, 0.0
+    for coding in available_encodings():
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESSION.brotli_quality)
+    # fixed mtime so the same body always compresses to the same bytes
+    return gzip.compress(body, compresslevel=COMPRESSION.gzip_level, mtime=0)
+
+
+def build_compressor(encoding: str) -> Tuple[Callable, Callable]:
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=COMPRESSION.brotli_quality)
+        return compressor.process, compressor.finish
+    # wbits 16 + MAX_WBITS writes the gzip header and trailer
+    compressor = zlib.compressobj(COMPRESSION.gzip_level, zlib.DEFLATED, 31)
+    return compressor.compress, compressor.flush
+
+
+async def compress_stream(
+    body_iterator: AsyncIterator[bytes], encoding: str
+) -> AsyncIterator[bytes]:
+    compress_chunk, finish = build_compressor(encoding)
+    async for chunk in body_iterator:
+        data = compress_chunk(chunk)
+        if data:
+            yield data
+    yield finish()
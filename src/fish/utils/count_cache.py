@@ -0,0 +1,36 @@
+import time
+from collections import namedtuple
+from typing import Callable, Dict, Optional
+
+from src.fish.db.models import Base
+
+CachedCount = namedtuple("CachedCount", ("count", "expires_at"))
+
+
+class ModelCountCache:
+    def __init__(self, ttl: float = 60.0, estimated: bool = False):
+        self.ttl = ttl
+        self.estimated = estimated
+        self._counts: Dict[str, CachedCount] = {}
+
+    def configure(self, ttl: float, estimated: bool):
+        self.ttl = ttl
+        self.estimated = estimated
+        self.invalidate()
+
+    def get(self, model: Base, load: Callable[[], int]) -> int:
+        key = model.__tablename__
+        now = time.monotonic()
+        cached = self._counts.get(key)
+        if cached is not None and now < cached.expires_at:
+            return cached.count
+        count = load()
+        if self.ttl > 0:
+            self._counts[key] = CachedCount(count=count, expires_at=now + self.ttl)
+        return count
+
+    def invalidate(self, model: Optional[Base] = None):
+        if model is None:
+            self._counts.clear()
+        else:
+            self._counts.pop(model.__tablename__, None)
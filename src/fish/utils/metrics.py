@@ -0,0 +1,223 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Engine, event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+UNMATCHED_ROUTE = "unmatched"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsSettings:
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+
+    def configure(self, settings: dict):
+        self.enabled = settings.get("METRICS", "false").lower() == "true"
+
+
+METRICS = MetricsSettings()
+
+
+class RequestStats:
+    __slots__ = ("scope", "queries", "db_seconds", "pool_wait", "serialization")
+
+    def __init__(self, scope: Optional[dict] = None):
+        self.scope = scope
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.pool_wait = 0.0
+        self.serialization = 0.0
+
+
+# set by the metrics middleware, shared with the threadpool / greenlet the
+# route runs in, None outside a request (startup, ingest, tests)
+REQUEST_STATS: ContextVar[Optional[RequestStats]] = ContextVar(
+    "request_stats", default=None
+)
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def format_labels(pairs: List[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{escape_label(str(v))}"' for k, v in pairs) + "}"
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> per bucket counts (last one is +Inf), then the running sum
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((k, list(v)) for k, v in self._series.items())
+        for labels, counts in series:
+            pairs = list(zip(self.labelnames, labels))
+            total = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts[:-1]):
+                total += count
+                le = format_labels([*pairs, ("le", bound)])
+                lines.append(f"{self.name}_bucket{le} {total}")
+            lines.append(f"{self.name}_sum{format_labels(pairs)} {counts[-1]}")
+            lines.append(f"{self.name}_count{format_labels(pairs)} {total}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram(
+    "fish_http_request_duration_seconds",
+    "Time from the outermost middleware to the response head.",
+    ("method", "route", "status"),
+)
+REQUEST_QUERIES = Histogram(
+    "fish_http_request_db_queries",
+    "Statements executed per request.",
+    ("route",),
+    QUERY_COUNT_BUCKETS,
+)
+REQUEST_DB_SECONDS = Histogram(
+    "fish_http_request_db_duration_seconds",
+    "Time spent executing statements per request.",
+    ("route",),
+)
+REQUEST_POOL_WAIT = Histogram(
+    "fish_http_request_pool_wait_seconds",
+    "Time spent waiting on a pool connection per request.",
+    ("route",),
+)
+REQUEST_SERIALIZATION = Histogram(
+    "fish_http_request_serialization_seconds",
+    "Time spent encoding rows and envelopes per request.",
+    ("route",),
+)
+QUERY_SECONDS = Histogram(
+    "fish_db_query_duration_seconds", "Time spent executing each statement."
+)
+POOL_METRICS = (
+    ("fish_db_pool_checked_out", "gauge", "checked_out"),
+    ("fish_db_pool_overflow", "gauge", "overflow"),
+    ("fish_db_pool_checkouts_total", "counter", "checkouts"),
+    ("fish_db_pool_timeouts_total", "counter", "timeouts"),
+    ("fish_db_pool_wait_seconds_total", "counter", "total_wait_seconds"),
+    ("fish_db_pool_wait_seconds_max", "gauge", "max_wait_seconds"),
+)
+HISTOGRAMS = (
+    REQUEST_SECONDS,
+    REQUEST_QUERIES,
+    REQUEST_DB_SECONDS,
+    REQUEST_POOL_WAIT,
+    REQUEST_SERIALIZATION,
+    QUERY_SECONDS,
+)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    # context is None for a few dialect internals, those go untimed
+    if context is not None:
+        context._metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    start = getattr(context, "_metrics_start", None)
+    if start is None:
+        return
+    elapsed = context._metrics_elapsed = time.perf_counter() - start
+    QUERY_SECONDS.observe(elapsed)
+    stats = REQUEST_STATS.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+
+
+def instrument_engine(engine: Engine):
+    # async engines are instrumented through their .sync_engine
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def query_elapsed(context) -> Optional[float]:
+    # set by the after_cursor_execute listener above, for listeners added later
+    return getattr(context, "_metrics_elapsed", None)
+
+
+def record_pool_wait(wait: float):
+    stats = REQUEST_STATS.get()
+    if stats is not None:
+        stats.pool_wait += wait
+
+
+def record_serialization(seconds: float):
+    stats = REQUEST_STATS.get()
+    if stats is not None:
+        stats.serialization += seconds
+
+
+@lru_cache(maxsize=None)
+def route_template(app, endpoint) -> str:
+    # label by the declared path, raw urls would make a series per id
+    for route in app.routes:
+        if getattr(route, "endpoint", None) is endpoint:
+            return route.path
+    return UNMATCHED_ROUTE
+
+
+def scope_route(scope: dict) -> str:
+    # the router leaves the matched endpoint in the shared scope
+    return route_template(scope["app"], scope.get("endpoint"))
+
+
+def observe_request(
+    method: str, route: str, status: int, seconds: float, stats: RequestStats
+):
+    REQUEST_SECONDS.observe(seconds, method, route, str(status))
+    REQUEST_QUERIES.observe(stats.queries, route)
+    REQUEST_DB_SECONDS.observe(stats.db_seconds, route)
+    REQUEST_POOL_WAIT.observe(stats.pool_wait, route)
+    REQUEST_SERIALIZATION.observe(stats.serialization, route)
+
+
+def render_pool_metrics(pool_statuses: Dict[str, dict]) -> List[str]:
+    # statuses as built by get_pool_status, only pools that time their waits
+    timed = {
+        name: {**status, **status["wait"]}
+        for name, status in pool_statuses.items()
+        if "wait" in status
+    }
+    lines = []
+    for metric, kind, key in POOL_METRICS:
+        lines.append(f"# TYPE {metric} {kind}")
+        for name, status in timed.items():
+            lines.append(f"{metric}{format_labels([('pool', name)])} {status[key]}")
+    return lines
+
+
+def render_metrics(pool_statuses: Dict[str, dict]) -> str:
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    lines.extend(render_pool_metrics(pool_statuses))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,120 @@
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from typing import Any, Callable, Hashable
+
+CachedValue = namedtuple("CachedValue", ("value", "expires_at"))
+MISSING = object()
+
+
+class LRUCache:
+    def __init__(self, maxsize: int = 0, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, CachedValue]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def configure(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.invalidate()
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None or time.monotonic() >= cached.expires_at:
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return cached.value
+
+    def set(self, key: Hashable, value: Any):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = CachedValue(value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# all disabled (maxsize 0) until configure_operation_cache runs at startup
+OPERATION_CACHE = LRUCache()
+# url -> last ETag served, lets conditional GETs skip the route entirely. only
+# cleared in this process, so a change made elsewhere (e.g. the ingest cli
+# without --api-url) can be answered 304 for up to ETAG_CACHE_TTL
+ETAG_CACHE = LRUCache()
+# (ETag, encoding) -> compressed body, keyed on content so it never goes stale
+COMPRESSED_CACHE = LRUCache()
+
+
+def configure_operation_cache(settings: dict):
+    OPERATION_CACHE.configure(
+        maxsize=int(settings.get("OPERATION_CACHE_SIZE", 0)),
+        ttl=float(settings.get("OPERATION_CACHE_TTL", 300)),
+    )
+    ETAG_CACHE.configure(
+        maxsize=int(settings.get("ETAG_CACHE_SIZE", 0)),
+        ttl=float(settings.get("ETAG_CACHE_TTL", 300)),
+    )
+    COMPRESSED_CACHE.configure(
+        maxsize=int(settings.get("COMPRESSED_CACHE_SIZE", 0)),
+        ttl=float(settings.get("COMPRESSED_CACHE_TTL", 3600)),
+    )
+
+
+def invalidate_caches():
+    OPERATION_CACHE.invalidate()
+    ETAG_CACHE.invalidate()
+
+
+def cached_operation(operation: Callable) -> Callable:
+    # keyed on everything but the leading db session
+    def build_key(args: tuple, kwargs: dict) -> Hashable:
+        return operation.__qualname__, args, tuple(sorted(kwargs.items()))
+
+    if inspect.iscoroutinefunction(operation):
+
+        @functools.wraps(operation)
+        async def async_wrapper(db, *args, **kwargs):
+            key = build_key(args, kwargs)
+            value = OPERATION_CACHE.get(key)
+            if value is MISSING:
+                value = await operation(db, *args, **kwargs)
+                OPERATION_CACHE.set(key, value)
+            return value
+
+        return async_wrapper
+
+    @functools.wraps(operation)
+    def wrapper(db, *args, **kwargs):
+        key = build_key(args, kwargs)
+        value = OPERATION_CACHE.get(key)
+        if value is MISSING:
+            value = operation(db, *args, **kwargs)
+            OPERATION_CACHE.set(key, value)
+        return value
+
+    return wrapper
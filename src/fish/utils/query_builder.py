@@ -1,10 +1,29 @@
+import base64
+import binascii
 import uuid
-from typing import List, Union
+from typing import List, Optional, Sequence, Tuple, Union
 
-from fastapi import HTTPException
+from fastapi import HTTPException, Response
+from pydantic import BaseModel
+from sqlalchemy import (
+    Column,
+    ColumnElement,
+    Row,
+    Select,
+    String,
+    func,
+    literal,
+    or_,
+    select,
+    text,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from src.fish.db.models import Base
+from src.fish.db.models import BNG_SRID, Base
+
+NEXT_CURSOR_HEADER = "x-next-cursor"
+TOTAL_COUNT_HEADER = "x-total-count"
 
 
 class PaginationError(Exception):
@@ -15,12 +34,241 @@ def get_all(db: Session, sql_model: Base, skip: int, limit: int) -> List[Base]:
     return db.query(sql_model).offset(skip).limit(limit).all()
 
 
+def encode_cursor(id: Union[str, int, uuid.UUID]) -> str:
+    # result models hand back UUIDs, but site ids are stored as bare hex, so
+    # the dashed str() form would compare wrongly against fish_sites.id
+    if isinstance(id, uuid.UUID):
+        id = id.hex
+    return base64.urlsafe_b64encode(str(id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sql_model: Base) -> Optional[Union[str, int, uuid.UUID]]:
+    # an empty cursor starts keyset pagination from the first row
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw_id = base64.urlsafe_b64decode(padded.encode()).decode()
+        return sql_model.id.type.python_type(raw_id)
+    except (ValueError, binascii.Error):
+        raise HTTPException(status_code=400, detail=f"invalid cursor {cursor}")
+
+
+def set_next_cursor(response: Response, rows: list, limit: int, cursor: Optional[str]):
+    # a short page means keyset pagination has reached the end of the table
+    if cursor is not None and rows and len(rows) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1].id)
+
+
+def set_total_count(response: Response, total_count: Optional[int]):
+    # lets the pagination middleware report a filtered count, not the table's
+    if total_count is not None:
+        response.headers[TOTAL_COUNT_HEADER] = str(total_count)
+
+
+def build_page_statement(
+    sql_model: Base,
+    skip: int,
+    limit: int,
+    cursor: Optional[str] = None,
+    columns: Optional[List[Column]] = None,
+    filters: Sequence[ColumnElement] = (),
+) -> Select:
+    statement = select(*columns) if columns else select(sql_model)
+    statement = statement.where(*filters)
+    if cursor is None:
+        return statement.offset(skip).limit(limit)
+    after = decode_cursor(cursor, sql_model)
+    statement = statement.order_by(sql_model.id)
+    if after is not None:
+        statement = statement.where(sql_model.id > after)
+    return statement.limit(limit)
+
+
+def get_page_rows(
+    db: Session,
+    sql_model: Base,
+    skip: int,
+    limit: int,
+    cursor: Optional[str],
+    columns: List[Column],
+    filters: Sequence[ColumnElement] = (),
+) -> List[Row]:
+    return db.execute(
+        build_page_statement(sql_model, skip, limit, cursor, columns, filters)
+    ).all()
+
+
+async def get_page_rows_async(
+    db: AsyncSession,
+    sql_model: Base,
+    skip: int,
+    limit: int,
+    cursor: Optional[str],
+    columns: List[Column],
+    filters: Sequence[ColumnElement] = (),
+) -> List[Row]:
+    result = await db.execute(
+        build_page_statement(sql_model, skip, limit, cursor, columns, filters)
+    )
+    return result.all()
+
+
+def get_page_results(
+    db: Session,
+    sql_model: Base,
+    result_model: BaseModel,
+    skip: int,
+    limit: int,
+    cursor: Optional[str] = None,
+    filters: Sequence[ColumnElement] = (),
+) -> List[BaseModel]:
+    columns = result_model_columns(sql_model, result_model)
+    rows = get_page_rows(db, sql_model, skip, limit, cursor, columns, filters)
+    return [result_model(**row._mapping) for row in rows]
+
+
+async def get_page_results_async(
+    db: AsyncSession,
+    sql_model: Base,
+    result_model: BaseModel,
+    skip: int,
+    limit: int,
+    cursor: Optional[str] = None,
+    filters: Sequence[ColumnElement] = (),
+) -> List[BaseModel]:
+    columns = result_model_columns(sql_model, result_model)
+    rows = await get_page_rows_async(
+        db, sql_model, skip, limit, cursor, columns, filters
+    )
+    return [result_model(**row._mapping) for row in rows]
+
+
 def get_model_count(db: Session, sql_model: Base) -> int:
     return db.query(sql_model).count()
 
 
-def get_by_id(db: Session, id: Union[str, int], sql_model: Base) -> Base:
-    return db.query(sql_model).get(id)
+def build_filtered_count_statement(
+    sql_model: Base, filters: Sequence[ColumnElement]
+) -> Select:
+    return select(func.count()).select_from(sql_model).where(*filters)
+
+
+def get_estimated_model_count(db: Session, sql_model: Base) -> int:
+    # planner statistics, only as fresh as the last ANALYZE / autovacuum
+    estimate = db.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+        {"table": sql_model.__tablename__},
+    ).scalar()
+    if estimate is None or estimate < 0:
+        return get_model_count(db, sql_model)
+    return estimate
+
+
+def result_model_columns(sql_model: Base, result_model: BaseModel) -> List[Column]:
+    return [sql_model.__table__.c[name] for name in result_model.model_fields]
+
+
+def build_by_id_statement(
+    id: Union[str, int, uuid.UUID], sql_model: Base, columns: List[Column]
+) -> Select:
+    return select(*columns).where(sql_model.id == id)
+
+
+def stored_id_forms(id: Union[str, int, uuid.UUID]) -> tuple:
+    # site ids are stored as bare hex but served (and sent back to us) dashed,
+    # so a uuid-shaped string is looked up in both forms
+    if isinstance(id, str):
+        try:
+            hex_id = uuid.UUID(id).hex
+        except ValueError:
+            return (id,)
+        if hex_id != id:
+            return (id, hex_id)
+    return (id,)
+
+
+def build_by_ids_statement(
+    ids: List[Union[str, int, uuid.UUID]], sql_model: Base, columns: List[Column]
+) -> Select:
+    forms = dict.fromkeys(form for id in ids for form in stored_id_forms(id))
+    return select(*columns).where(sql_model.id.in_(list(forms)))
+
+
+def order_batch_results(
+    ids: List[Union[str, int, uuid.UUID]], rows: List[Row], result_model
+) -> Tuple[list, list]:
+    # one IN query, then back into the order (and duplicates) of the request,
+    # missing ids are reported as the caller sent them
+    found = {row.id: row for row in rows}
+    matches = {
+        id: next((found[form] for form in stored_id_forms(id) if form in found), None)
+        for id in dict.fromkeys(ids)
+    }
+    data = [
+        result_model.model_validate(matches[id], from_attributes=True)
+        for id in ids
+        if matches[id] is not None
+    ]
+    missing = [id for id, row in matches.items() if row is None]
+    return data, missing
+
+
+def get_items_by_ids(
+    db: Session, ids: List[Union[str, int, uuid.UUID]], model: Base, result_model
+) -> Tuple[list, list]:
+    columns = result_model_columns(model, result_model)
+    statement = build_by_ids_statement(list(dict.fromkeys(ids)), model, columns)
+    return order_batch_results(ids, db.execute(statement).all(), result_model)
+
+
+async def get_items_by_ids_async(
+    db: AsyncSession, ids: List[Union[str, int, uuid.UUID]], model: Base, result_model
+) -> Tuple[list, list]:
+    columns = result_model_columns(model, result_model)
+    statement = build_by_ids_statement(list(dict.fromkeys(ids)), model, columns)
+    result = await db.execute(statement)
+    return order_batch_results(ids, result.all(), result_model)
+
+
+def get_by_id(
+    db: Session,
+    id: Union[str, int],
+    sql_model: Base,
+    columns: Optional[List[Column]] = None,
+) -> Union[Base, Row]:
+    if columns is None:
+        return db.query(sql_model).get(id)
+    return db.execute(build_by_id_statement(id, sql_model, columns)).first()
+
+
+def build_grid_point(easting: float, northing: float) -> ColumnElement:
+    return func.ST_SetSRID(func.ST_MakePoint(easting, northing), BNG_SRID)
+
+
+def escape_like(value: str, escape: str = "/") -> str:
+    for char in (escape, "%", "_"):
+        value = value.replace(char, escape + char)
+    return value
+
+
+def build_search_statement(
+    sql_model: Base,
+    result_model: BaseModel,
+    search_text: ColumnElement,
+    q: str,
+    limit: int,
+) -> Select:
+    # substring or fuzzy word match, both answered by the trigram gin index
+    term = literal(q, String)
+    score = func.word_similarity(term, search_text).label("score")
+    pattern = literal(f"%{escape_like(q)}%", String)
+    return (
+        select(*result_model_columns(sql_model, result_model), score)
+        .where(or_(search_text.ilike(pattern, escape="/"), search_text.op("%>")(term)))
+        .order_by(score.desc(), sql_model.id)
+        .limit(limit)
+    )
 
 
 def convert_sql_obj_to_dict(table: Base):
@@ -35,7 +283,18 @@ def _validate_paginate_param(param: int, upper_bound: int, message: str):
 def get_item_by_id(
     db: Session, id: Union[str, int, uuid.UUID], model: Base, result_model
 ):
-    item = get_by_id(db, id, model)
+    item = get_by_id(db, id, model, result_model_columns(model, result_model))
+    if item is None:
+        raise HTTPException(status_code=404, detail=f"Unable to find item with ID {id}")
+    return result_model.model_validate(item, from_attributes=True)
+
+
+async def get_item_by_id_async(
+    db: AsyncSession, id: Union[str, int, uuid.UUID], model: Base, result_model
+):
+    columns = result_model_columns(model, result_model)
+    result = await db.execute(build_by_id_statement(id, model, columns))
+    item = result.first()
     if item is None:
         raise HTTPException(status_code=404, detail=f"Unable to find item with ID {id}")
-    return result_model(**convert_sql_obj_to_dict(item))
+    return result_model.model_validate(item, from_attributes=True)
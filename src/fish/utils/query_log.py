@@ -0,0 +1,103 @@
+import logging
+from typing import Optional
+
+from sqlalchemy import Engine, event
+
+from src.fish.utils.metrics import (
+    REQUEST_STATS,
+    RequestStats,
+    query_elapsed,
+    scope_route,
+)
+
+logger = logging.getLogger(__name__)
+EXPLAINABLE = ("select", "with")
+
+
+class QueryLogSettings:
+    def __init__(
+        self, slow_query_ms: float = 0, explain: bool = False, budget: int = 0
+    ):
+        self.slow_query_ms = slow_query_ms
+        self.explain = explain
+        self.budget = budget
+
+    def configure(self, settings: dict):
+        # 0 turns either check off
+        self.slow_query_ms = float(settings.get("SLOW_QUERY_MS", 0))
+        self.explain = settings.get("SLOW_QUERY_EXPLAIN", "false").lower() == "true"
+        self.budget = int(settings.get("QUERY_BUDGET", 0))
+
+    @property
+    def enabled(self) -> bool:
+        return self.slow_query_ms > 0 or self.budget > 0
+
+
+QUERY_LOG = QueryLogSettings()
+
+
+def describe_binds(parameters, many: bool) -> str:
+    # types only, values can be anything a client sent us
+    if many:
+        rows = len(parameters)
+        return f"{rows} x ({describe_binds(parameters[0], False)})" if rows else ""
+    if isinstance(parameters, dict):
+        return ", ".join(f"{k}: {type(v).__name__}" for k, v in parameters.items())
+    return ", ".join(type(v).__name__ for v in parameters or ())
+
+
+def current_route(stats: Optional[RequestStats]) -> str:
+    if stats is None or stats.scope is None:
+        return "-"
+    return scope_route(stats.scope)
+
+
+def explain_statement(conn, statement: str, parameters) -> str:
+    prefix = "EXPLAIN QUERY PLAN" if conn.dialect.name == "sqlite" else "EXPLAIN"
+    # a raw cursor so the explain doesn't fire (and time) itself
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(f"{prefix} {statement}", parameters)
+        return "\n".join(str(row[-1]) for row in cursor.fetchall())
+    finally:
+        cursor.close()
+
+
+def _log_slow_query(conn, cursor, statement, parameters, context, many):
+    elapsed = query_elapsed(context)
+    if not QUERY_LOG.slow_query_ms or elapsed is None:
+        return
+    if elapsed * 1000 < QUERY_LOG.slow_query_ms:
+        return
+    message = "slow query %.1fms on %s\n%s\nbinds: %s"
+    args = [
+        elapsed * 1000,
+        current_route(REQUEST_STATS.get()),
+        statement,
+        describe_binds(parameters, many),
+    ]
+    if (
+        QUERY_LOG.explain
+        and not many
+        and statement.lstrip().lower().startswith(EXPLAINABLE)
+    ):
+        message += "\nplan:\n%s"
+        args.append(explain_statement(conn, statement, parameters))
+    logger.warning(message, *args)
+
+
+def instrument_query_log(engine: Engine):
+    # relies on the metrics listeners (instrument_engine) having run first
+    if not event.contains(engine, "after_cursor_execute", _log_slow_query):
+        event.listen(engine, "after_cursor_execute", _log_slow_query)
+
+
+def check_query_budget(method: str, route: str, stats: RequestStats):
+    if QUERY_LOG.budget and stats.queries > QUERY_LOG.budget:
+        logger.warning(
+            "%s %s ran %d queries, over the budget of %d",
+            method,
+            route,
+            stats.queries,
+            QUERY_LOG.budget,
+        )
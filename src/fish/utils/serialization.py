@@ -0,0 +1,90 @@
+import csv
+import io
+import time
+import uuid
+from functools import lru_cache
+from typing import Callable, Literal, Optional, Sequence, Tuple
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+from sqlalchemy import Row
+
+from src.fish.db.models import Base
+from src.fish.utils.metrics import record_serialization
+
+RowConverters = Tuple[Tuple[str, Optional[Callable]], ...]
+ExportFormat = Literal["ndjson", "csv"]
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+class FastResponseSettings:
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+
+    def configure(self, settings: dict):
+        self.enabled = settings.get("FAST_RESPONSES", "false").lower() == "true"
+
+
+FAST_RESPONSES = FastResponseSettings()
+
+
+@lru_cache(maxsize=None)
+def build_row_converters(sql_model: Base, result_model: BaseModel) -> RowConverters:
+    # only coerce where the output model and the column disagree on type,
+    # e.g. site ids stored as plain strings but returned as UUIDs
+    converters = []
+    for name, field in result_model.model_fields.items():
+        column = sql_model.__table__.c[name]
+        convert = None
+        if field.annotation is uuid.UUID and column.type.python_type is not uuid.UUID:
+            convert = uuid.UUID
+        converters.append((name, convert))
+    return tuple(converters)
+
+
+def row_to_dict(row: Row, converters: RowConverters) -> dict:
+    return {
+        name: value if convert is None or value is None else convert(value)
+        for (name, convert), value in zip(converters, row)
+    }
+
+
+def rows_to_json(rows: Sequence[Row], converters: RowConverters) -> bytes:
+    return orjson.dumps([row_to_dict(row, converters) for row in rows])
+
+
+def rows_to_ndjson(rows: Sequence[Row], converters: RowConverters) -> bytes:
+    return b"".join(
+        orjson.dumps(row_to_dict(row, converters), option=orjson.OPT_APPEND_NEWLINE)
+        for row in rows
+    )
+
+
+def rows_to_csv(
+    rows: Sequence[Row], converters: RowConverters, header: bool = False
+) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow([name for name, _ in converters])
+    writer.writerows(row_to_dict(row, converters).values() for row in rows)
+    return buffer.getvalue().encode()
+
+
+def encode_export_rows(
+    rows: Sequence[Row], converters: RowConverters, format: ExportFormat
+) -> bytes:
+    if format == "csv":
+        return rows_to_csv(rows, converters)
+    return rows_to_ndjson(rows, converters)
+
+
+def build_fast_response(
+    rows: Sequence[Row], sql_model: Base, result_model: BaseModel
+) -> Response:
+    converters = build_row_converters(sql_model, result_model)
+    start = time.perf_counter()
+    content = rows_to_json(rows, converters)
+    record_serialization(time.perf_counter() - start)
+    return Response(content=content, media_type="application/json")
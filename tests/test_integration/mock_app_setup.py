@@ -1,11 +1,14 @@
 from typing import List
 
 from sqlalchemy import StaticPool, create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
 
 from src.fish.db.models import Base
+from src.fish.operations.sites import refresh_site_species_summary
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+ASYNC_SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
 
 def generate_local_db_session() -> sessionmaker:
@@ -35,3 +38,31 @@ def populate_table(session: Session, rows: List[Base]):
     for row in rows:
         session.add(row)
     session.commit()
+
+
+def generate_local_async_db_session() -> async_sessionmaker:
+    engine = create_async_engine(
+        ASYNC_SQLALCHEMY_DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+        echo=True,
+    )
+    return async_sessionmaker(engine, autocommit=False, autoflush=False)
+
+
+TestingAsyncSessionLocal = generate_local_async_db_session()
+
+
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+
+async def populate_async_table(rows: List[Base]):
+    async with TestingAsyncSessionLocal() as session:
+        await session.run_sync(
+            lambda sync_session: Base.metadata.create_all(sync_session.connection())
+        )
+        session.add_all(rows)
+        await session.commit()
+        await session.run_sync(refresh_site_species_summary)
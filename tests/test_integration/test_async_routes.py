@@ -0,0 +1,110 @@
+import asyncio
+import datetime
+import uuid
+
+from _pytest.fixtures import fixture
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from test_integration.mock_app_setup import (
+    override_get_async_db,
+    populate_async_table,
+)
+
+from src.fish.db.engine import get_async_db
+from src.fish.db.models import DBSites, DBSpecies, DBSurvey
+from src.fish.routers import sites, species, surverys
+
+app = FastAPI()
+for router in (species.async_router, sites.async_router, surverys.async_router):
+    app.include_router(router=router)
+app.dependency_overrides[get_async_db] = override_get_async_db
+client = TestClient(app)
+
+
+@fixture(scope="module")
+def build_data():
+    asyncio.run(
+        populate_async_table(
+            [
+                DBSpecies(id=1, species_name="salmon", latin_name="fishy-fish"),
+                DBSpecies(id=2, species_name="gold fish", latin_name="aurum pisces"),
+                DBSites(
+                    id="01e8c83d-be5a-4e24-9039-4f4334e80a1b",
+                    top_tier_site="East Hampshire",
+                    site_parent_name="Hamble",
+                    site_name="Frog Mill",
+                    geo_water_body="GB107042016250",
+                ),
+                DBSurvey(
+                    id=uuid.UUID("b2cd2911-147a-402b-a6f5-776f37d8194c"),
+                    survey_id="1",
+                    event_date=datetime.date(2017, 7, 5),
+                    event_date_year=2017,
+                    survey_ranked_easting=1222,
+                    survey_ranked_northing=135353,
+                    species_id=1,
+                    area_id="01e8c83d-be5a-4e24-9039-4f4334e80a1b",
+                    fish_count=5,
+                ),
+            ]
+        )
+    )
+
+
+def test_get_all_species_async(build_data):
+    res = client.get("/species", params=[("limit", "1")])
+    assert res.json() == [
+        {"id": 1, "species_name": "salmon", "latin_name": "fishy-fish"}
+    ]
+
+
+def test_get_species_by_id_async__bad_id(build_data):
+    res = client.get("/species/10")
+    assert res.status_code == 404
+
+
+def test_get_species_by_site_async(build_data):
+    res = client.get("/sites/01e8c83d-be5a-4e24-9039-4f4334e80a1b/species")
+    assert res.json() == [
+        {
+            "species_name": "salmon",
+            "newest_year_recorded": 2017,
+            "oldest_year_recorded": 2017,
+            "total_count": 5,
+        }
+    ]
+
+
+def test_get_species_for_sites_async(build_data):
+    res = client.get("/species/1/sites")
+    assert res.headers["x-total-count"] == "1"
+    assert res.json() == [
+        {
+            "id": "01e8c83d-be5a-4e24-9039-4f4334e80a1b",
+            "top_tier_site": "East Hampshire",
+            "site_parent_name": "Hamble",
+            "site_name": "Frog Mill",
+        }
+    ]
+
+
+def test_get_species_for_sites_async__negative_skip(build_data):
+    res = client.get("/species/1/sites?skip=-1")
+    assert res.status_code == 404
+
+
+def test_get_surveys_by_id_async(build_data):
+    res = client.get("/surveys/b2cd2911-147a-402b-a6f5-776f37d8194c")
+    assert res.json()["fish_count"] == 5
+
+
+def test_export_surveys_async(build_data):
+    res = client.get("/surveys/export?format=csv")
+    lines = res.text.splitlines()
+    assert lines[0].startswith("id,survey_id")
+    assert lines[1].startswith("b2cd2911-147a-402b-a6f5-776f37d8194c,")
+
+
+def test_batch_get_species_async(build_data):
+    res = client.post("/species:batchGet", json={"ids": [2, 1]})
+    assert [species["id"] for species in res.json()["data"]] == [2, 1]
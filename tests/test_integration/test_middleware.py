@@ -1,3 +1,6 @@
+import asyncio
+import datetime
+import logging
 import uuid
 
 import pytest
@@ -14,6 +17,8 @@ from main import app
 from src.fish import middleware
 from src.fish.db.engine import get_db
 from src.fish.db.models import DBSites, DBSpecies, DBSurvey
+from src.fish.routers import internal
+from src.fish.utils import metrics, query_log
 
 app.dependency_overrides[get_db] = override_get_db
 client = TestClient(app)
@@ -82,7 +87,7 @@ def build_data():
             DBSurvey(
                 id=uuid.UUID("b2cd2911-147a-402b-a6f5-776f37d8194c"),
                 survey_id="1",
-                event_date="05/07/2017",
+                event_date=datetime.date(2017, 7, 5),
                 event_date_year=2017,
                 survey_ranked_easting=1222,
                 survey_ranked_northing=135353,
@@ -142,3 +147,166 @@ def test_fail_with_bad_query_params__bad_params(mock_get_count, build_species_da
     res = client.get("/species?where=1")
     assert res.status_code == 400
     assert res.json() == {"details": "Unexpected query parameters: {'where'}"}
+
+
+def test_wrap_response_with_pagination_results__next_cursor(mocker, build_species_data):
+    mocker.patch.object(middleware, "_get_model_count", return_value=3)
+    res = client.get("/species?limit=2&cursor=")
+    assert res.json()["next_cursor"] == "Mg"
+    res_two = client.get(res.json()["next_url"])
+    assert res_two.json() == {
+        "total_count": 3,
+        "next_url": None,
+        "next_cursor": None,
+        "data": [{"id": 3, "species_name": "salmon", "latin_name": "fishy-fish"}],
+    }
+
+
+def test_add_conditional_get_headers__etag(mock_get_count, build_species_data):
+    res = client.get("/species/1")
+    assert res.headers["cache-control"] == "public, max-age=3600"
+    res_two = client.get("/species/1", headers={"if-none-match": res.headers["etag"]})
+    assert res_two.status_code == 304
+    assert res_two.content == b""
+    assert res_two.headers["etag"] == res.headers["etag"]
+
+
+def test_add_conditional_get_headers__changed(mock_get_count, build_species_data):
+    res = client.get("/species/1", headers={"if-none-match": '"stale"'})
+    assert res.status_code == 200
+    assert res.json()["id"] == 1
+
+
+def test_add_conditional_get_headers__skips_route(
+    mocker, mock_get_count, build_species_data
+):
+    mocker.patch.object(middleware.ETAG_CACHE, "maxsize", 10)
+    etag = client.get("/species").headers["etag"]
+    count = mocker.patch.object(middleware, "_get_model_count")
+    res = client.get("/species", headers={"if-none-match": etag})
+    assert res.status_code == 304
+    count.assert_not_called()
+    middleware.ETAG_CACHE.invalidate()
+
+
+@fixture
+def enable_compression(mocker: MockerFixture):
+    mocker.patch.object(middleware.COMPRESSION, "enabled", True)
+    mocker.patch.object(middleware.COMPRESSION, "min_size", 0)
+
+
+def test_compress_response__gzip(
+    enable_compression, mock_get_count, build_species_data
+):
+    res = client.get("/species", headers={"accept-encoding": "gzip"})
+    assert res.headers["content-encoding"] == "gzip"
+    assert res.headers["vary"] == "accept-encoding"
+    assert res.headers["etag"].startswith('W/"')
+    assert res.json()["data"][0]["id"] == 1
+
+
+def test_compress_response__below_threshold(
+    mocker, enable_compression, mock_get_count, build_species_data
+):
+    mocker.patch.object(middleware.COMPRESSION, "min_size", 10_000)
+    res = client.get("/species", headers={"accept-encoding": "gzip"})
+    assert "content-encoding" not in res.headers
+    assert res.headers["vary"] == "accept-encoding"
+    assert res.json()["data"][0]["id"] == 1
+
+
+def test_compress_response__identity(
+    enable_compression, mock_get_count, build_species_data
+):
+    res = client.get("/species", headers={"accept-encoding": "identity"})
+    assert "content-encoding" not in res.headers
+    assert not res.headers["etag"].startswith("W/")
+
+
+def test_compress_response__precompressed(
+    mocker, enable_compression, mock_get_count, build_species_data
+):
+    mocker.patch.object(middleware.COMPRESSED_CACHE, "maxsize", 10)
+    compress = mocker.spy(middleware, "compress")
+    for _ in range(2):
+        res = client.get("/species/1", headers={"accept-encoding": "gzip"})
+        assert res.json()["id"] == 1
+    compress.assert_called_once()
+    middleware.COMPRESSED_CACHE.invalidate()
+
+
+def test_compress_response__weak_etag_revalidates(
+    enable_compression, mock_get_count, build_species_data
+):
+    etag = client.get("/species/1", headers={"accept-encoding": "gzip"}).headers["etag"]
+    res = client.get(
+        "/species/1", headers={"accept-encoding": "gzip", "if-none-match": etag}
+    )
+    assert res.status_code == 304
+
+
+def test_collect_request_metrics(mocker, mock_get_count, build_species_data):
+    mocker.patch.object(middleware.METRICS, "enabled", True)
+    metrics.instrument_engine(TestingSessionLocal.kw["bind"])
+    client.get("/species/1")
+    client.get("/species/2")
+    res = client.get("/metrics")
+    assert res.headers["content-type"].startswith("text/plain")
+    assert (
+        'fish_http_request_duration_seconds_count{method="GET",'
+        'route="/species/{id}",status="200"} 2'
+    ) in res.text
+    assert 'fish_http_request_db_queries_count{route="/species/{id}"} 2' in res.text
+    assert 'fish_http_request_db_queries_bucket{route="/species/{id}",le="0"} 0' in (
+        res.text
+    )
+
+
+def test_collect_request_metrics__slow_query_route(
+    mocker, caplog, mock_get_count, build_species_data
+):
+    mocker.patch.object(query_log.QUERY_LOG, "slow_query_ms", 1e-9)
+    metrics.instrument_engine(TestingSessionLocal.kw["bind"])
+    query_log.instrument_query_log(TestingSessionLocal.kw["bind"])
+    with caplog.at_level(logging.WARNING, logger=query_log.__name__):
+        client.get("/species/1")
+    assert any("on /species/{id}" in r.getMessage() for r in caplog.records)
+
+
+def test_wrap_response_with_pagination_results__count_off_event_loop(
+    mocker, build_species_data
+):
+    def count(model):
+        # raises if called on the thread running the event loop
+        with pytest.raises(RuntimeError):
+            asyncio.get_running_loop()
+        return 3
+
+    mocker.patch.object(middleware, "_get_model_count", side_effect=count)
+    assert client.get("/species").json()["total_count"] == 3
+
+
+def test_add_conditional_get_headers__no_store_not_tagged(mocker):
+    mocker.patch.object(middleware.ETAG_CACHE, "maxsize", 10)
+    mocker.patch.object(internal.INTERNAL, "token", "secret")
+    headers = {"x-internal-token": "secret"}
+    res = client.get("/internal/cache", headers=headers)
+    assert "etag" not in res.headers
+    assert res.headers["cache-control"] == "no-store"
+    res = client.get("/internal/cache", headers={**headers, "if-none-match": "*"})
+    assert res.status_code == 200
+    middleware.ETAG_CACHE.invalidate()
+
+
+def test_internal_router__off_without_token():
+    assert client.get("/internal/cache").status_code == 404
+    assert client.post("/internal/cache/invalidate").status_code == 404
+
+
+def test_internal_router__wrong_token(mocker):
+    mocker.patch.object(internal.INTERNAL, "token", "secret")
+    assert client.get("/internal/pool").status_code == 403
+    res = client.get("/internal/pool", headers={"x-internal-token": "guess"})
+    assert res.status_code == 403
+    res = client.get("/internal/pool", headers={"x-internal-token": "secret"})
+    assert res.status_code == 200
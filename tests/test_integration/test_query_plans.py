@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy import Select, text
+from test_integration.mock_app_setup import TestingSessionLocal
+
+from src.fish.operations.sites import (
+    site_species_summary_query_builder,
+    species_for_a_site_query_builder,
+)
+from src.fish.db.models import DBSurvey
+from src.fish.operations.input_models import SurveyFilters
+from src.fish.operations.species import retrieve_area_by_species_query_builder
+from src.fish.operations.surveys import build_survey_filters
+from src.fish.utils.query_builder import build_filtered_count_statement
+
+
+def explain(statement: Select) -> str:
+    with TestingSessionLocal() as session:
+        compiled = statement.compile(
+            dialect=session.bind.dialect, compile_kwargs={"literal_binds": True}
+        )
+        plan = session.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+    return "\n".join(row.detail for row in plan)
+
+
+@pytest.mark.parametrize(
+    "statement, indexes",
+    (
+        (
+            site_species_summary_query_builder(["foo-bar"]),
+            ("ix_fish_survey_area_id_species_id",),
+        ),
+        (
+            species_for_a_site_query_builder("foo-bar"),
+            ("sqlite_autoindex_fish_site_species_summary_1",),
+        ),
+        (
+            # both columns are equality lookups, either composite index covers it
+            retrieve_area_by_species_query_builder(1),
+            (
+                "ix_fish_survey_species_id_area_id",
+                "ix_fish_survey_area_id_species_id",
+            ),
+        ),
+    ),
+)
+def test_survey_queries_use_indexes(statement, indexes):
+    plan = explain(statement)
+    assert any(index in plan for index in indexes)
+
+
+def test_survey_bounding_box_uses_grid_index():
+    filters = SurveyFilters(min_easting=1000, max_easting=2000)
+    statement = build_filtered_count_statement(DBSurvey, build_survey_filters(filters))
+    assert "ix_fish_survey_easting_northing" in explain(statement)
@@ -1,8 +1,11 @@
+import datetime
 import uuid
 
+import pytest
 from _pytest.fixtures import fixture
 from fastapi.testclient import TestClient
 from pytest_mock import MockerFixture
+from sqlalchemy import delete
 from test_integration.mock_app_setup import (
     TestingSessionLocal,
     override_get_db,
@@ -13,6 +16,8 @@ from main import app
 from src.fish import middleware
 from src.fish.db.engine import get_db
 from src.fish.db.models import DBSites, DBSpecies, DBSurvey
+from src.fish.operations.sites import refresh_site_species_summary
+from src.fish.utils.serialization import FAST_RESPONSES
 
 app.dependency_overrides[get_db] = override_get_db
 client = TestClient(app)
@@ -32,6 +37,32 @@ def build_species_data():
         populate_table(session, test_species)
 
 
+@fixture
+def build_hex_site_data():
+    # stored the way the seed csv stores them, bare hex rather than dashed
+    ids = sorted(
+        ["00005d07e9f912b0838cc1407d4bb709", *(uuid.uuid4().hex for _ in range(4))]
+    )
+    with TestingSessionLocal() as session:
+        populate_table(
+            session,
+            [
+                DBSites(
+                    id=id,
+                    top_tier_site="East Hampshire",
+                    site_parent_name="Hamble",
+                    site_name=id,
+                    geo_water_body="GB107042016250",
+                )
+                for id in ids
+            ],
+        )
+    yield ids
+    with TestingSessionLocal() as session:
+        session.execute(delete(DBSites).where(DBSites.id.in_(ids)))
+        session.commit()
+
+
 @fixture
 def build_site_data():
     with TestingSessionLocal() as session:
@@ -61,7 +92,7 @@ def build_survey_data(build_species_data, build_site_data):
             DBSurvey(
                 id=uuid.UUID("b2cd2911-147a-402b-a6f5-776f37d8194c"),
                 survey_id="1",
-                event_date="05/07/2017",
+                event_date=datetime.date(2017, 7, 5),
                 event_date_year=2017,
                 survey_ranked_easting=1222,
                 survey_ranked_northing=135353,
@@ -72,7 +103,7 @@ def build_survey_data(build_species_data, build_site_data):
             DBSurvey(
                 id=uuid.UUID("4dacc6b1-75a7-4eda-8584-31c55829da21"),
                 survey_id="1",
-                event_date="05/07/2016",
+                event_date=datetime.date(2016, 7, 5),
                 event_date_year=2016,
                 survey_ranked_easting=1222,
                 survey_ranked_northing=135353,
@@ -82,6 +113,7 @@ def build_survey_data(build_species_data, build_site_data):
             ),
         ]
         populate_table(session, test_surveys)
+        refresh_site_species_summary(session)
 
 
 def test_get_all_sites__200_res(mock_middleware, build_site_data):
@@ -174,3 +206,91 @@ def test_api_get_fish_species_for_a_site__404_with_bad_id(
 ):
     res = client.get("/sites/01e8c93a-be5a-4e10-9039-4f4554e80b1c/species")
     assert res.status_code == 404
+
+
+def test_get_all_sites__fast_response_matches(
+    mocker: MockerFixture, mock_middleware, build_site_data
+):
+    expected = client.get("/sites").json()
+    mocker.patch.object(FAST_RESPONSES, "enabled", True)
+    assert client.get("/sites").json() == expected
+
+
+def test_api_get_species_by_site__refresh_one_site(mock_middleware, build_survey_data):
+    with TestingSessionLocal() as session:
+        populate_table(
+            session,
+            [
+                DBSurvey(
+                    id=uuid.UUID("5dacc6b1-75a7-4eda-8584-31c55829da21"),
+                    survey_id="2",
+                    event_date=datetime.date(2020, 7, 5),
+                    event_date_year=2020,
+                    survey_ranked_easting=1222,
+                    survey_ranked_northing=135353,
+                    species_id=1,
+                    area_id="01e8c83d-be5a-4e24-9039-4f4334e80a1b",
+                    fish_count=None,
+                )
+            ],
+        )
+        refresh_site_species_summary(
+            session, area_ids=["01e8c83d-be5a-4e24-9039-4f4334e80a1b"]
+        )
+    res = client.get("/sites/01e8c83d-be5a-4e24-9039-4f4334e80a1b/species")
+    assert res.json() == [
+        {
+            "species_name": "salmon",
+            "newest_year_recorded": 2020,
+            "oldest_year_recorded": 2016,
+            "total_count": 7,
+        }
+    ]
+
+
+def test_batch_get_sites(build_site_data):
+    res = client.post(
+        "/sites:batchGet",
+        json={
+            "ids": [
+                "01e8c83d-be5a-4e24-9039-4f4334e80a1c",
+                "missing-site",
+                "01e8c83d-be5a-4e24-9039-4f4334e80a1b",
+            ]
+        },
+    )
+    assert [site["site_name"] for site in res.json()["data"]] == ["Frog Mill", "Mill"]
+    assert res.json()["missing"] == ["missing-site"]
+
+
+def test_batch_get_sites__dashed_ids_for_hex_rows(build_hex_site_data):
+    dashed = "00005d07-e9f9-12b0-838c-c1407d4bb709"
+    missing = "00005d07-e9f9-12b0-838c-c1407d4bb700"
+    res = client.post("/sites:batchGet", json={"ids": [dashed, missing, dashed]})
+    assert [site["id"] for site in res.json()["data"]] == [dashed, dashed]
+    assert res.json()["missing"] == [missing]
+
+
+def test_search_sites__query_too_short():
+    res = client.get("/sites/search?q=a")
+    assert res.status_code == 422
+
+
+def test_get_sites_near__bad_radius():
+    response = client.get("/sites/near?easting=1&northing=2&radius=50001")
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize("fast", (False, True))
+def test_get_all_sites__cursor_pages(
+    mocker, mock_middleware, build_hex_site_data, fast
+):
+    mocker.patch.object(FAST_RESPONSES, "enabled", fast)
+    ids = build_hex_site_data
+    seen, url = [], "/sites?limit=2&cursor="
+    while url:
+        body = client.get(url).json()
+        seen.extend(site["site_name"] for site in body["data"])
+        url = body["next_url"]
+    # other tests' sites may share the table, only check ours
+    assert [id for id in seen if id in ids] == ids
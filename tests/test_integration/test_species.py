@@ -1,3 +1,4 @@
+import datetime
 import uuid
 
 from _pytest.fixtures import fixture
@@ -13,6 +14,8 @@ from main import app
 from src.fish import middleware
 from src.fish.db.engine import get_db
 from src.fish.db.models import DBSites, DBSpecies, DBSurvey
+from src.fish.operations import species
+from src.fish.utils.operation_cache import OPERATION_CACHE
 
 app.dependency_overrides[get_db] = override_get_db
 client = TestClient(app)
@@ -51,7 +54,7 @@ def build_survey_data(build_species_data, build_site_data):
             DBSurvey(
                 id=uuid.UUID("b2cd2911-147a-402b-a6f5-776f37d8194c"),
                 survey_id="1",
-                event_date="05/07/2010",
+                event_date=datetime.date(2010, 7, 5),
                 event_date_year=2017,
                 survey_ranked_easting=1222,
                 survey_ranked_northing=135353,
@@ -62,7 +65,7 @@ def build_survey_data(build_species_data, build_site_data):
             DBSurvey(
                 id=uuid.UUID("4dacc6b1-75a7-4eda-8584-31c55829da21"),
                 survey_id="1",
-                event_date="05/07/2010",
+                event_date=datetime.date(2010, 7, 5),
                 event_date_year=2017,
                 survey_ranked_easting=1222,
                 survey_ranked_northing=135353,
@@ -148,14 +151,25 @@ def test_species_by_id__bad_id_str(mock_middleware, build_species_data):
 
 def test_get_species_for_sites(mock_middleware, build_survey_data):
     response = client.get("species/2/sites")
-    assert response.json() == [
-        {
-            "id": "foo-bar",
-            "top_tier_site": "East Hampshire",
-            "site_parent_name": "Hamble",
-            "site_name": "Frog Mill",
-        }
-    ]
+    assert response.json() == {
+        "total_count": 1,
+        "next_url": None,
+        "data": [
+            {
+                "id": "foo-bar",
+                "top_tier_site": "East Hampshire",
+                "site_parent_name": "Hamble",
+                "site_name": "Frog Mill",
+            }
+        ],
+    }
+
+
+def test_get_species_for_sites__single_query(mocker, build_survey_data):
+    count = mocker.spy(species, "get_sites_by_species_id_count")
+    response = client.get("species/2/sites")
+    assert response.json()["total_count"] == 1
+    count.assert_not_called()
 
 
 def test_get_species_for_sites__bad_limit(mock_middleware, build_survey_data):
@@ -172,8 +186,44 @@ def test_get_species_for_sites__bad_skip(mock_middleware, build_survey_data):
     assert message == "skip of 10 exceeds total count of 1"
 
 
+def test_get_species_for_sites__negative_skip(mock_middleware, build_survey_data):
+    response = client.get("species/2/sites", params=[("skip", "-1")])
+    assert response.status_code == 404
+    assert response.json()["detail"] == "skip of -1 is below 0"
+
+
 def test_get_species_for_sites__no_species(mock_middleware, build_survey_data):
     response = client.get("species/10/sites")
     message = response.json()["detail"]
     assert response.status_code == 404
     assert message == "unable to result with species id of 10"
+
+
+@fixture
+def operation_cache():
+    OPERATION_CACHE.configure(maxsize=10, ttl=60)
+    yield OPERATION_CACHE
+    OPERATION_CACHE.configure(maxsize=0, ttl=60)
+
+
+def test_species_by_id__cached(
+    mocker: MockerFixture, operation_cache, build_species_data
+):
+    get_item_by_id = mocker.spy(species, "get_item_by_id")
+    first = client.get("/species/1")
+    second = client.get("/species/1")
+    assert first.json() == second.json()
+    assert get_item_by_id.call_count == 1
+    assert operation_cache.stats()["hits"] == 1
+
+
+def test_batch_get_species(mock_middleware, build_species_data):
+    res = client.post("/species:batchGet", json={"ids": [3, 99, 1, 3]})
+    assert res.status_code == 200
+    assert [species["id"] for species in res.json()["data"]] == [3, 1, 3]
+    assert res.json()["missing"] == [99]
+
+
+def test_batch_get_species__too_many_ids(mock_middleware, build_species_data):
+    res = client.post("/species:batchGet", json={"ids": list(range(101))})
+    assert res.status_code == 422
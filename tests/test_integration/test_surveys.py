@@ -1,8 +1,11 @@
+import datetime
+import json
 import uuid
 
 from _pytest.fixtures import fixture
 from fastapi.testclient import TestClient
 from pytest_mock import MockerFixture
+from sqlalchemy import delete, event
 from test_integration.mock_app_setup import (
     TestingSessionLocal,
     override_get_db,
@@ -12,7 +15,9 @@ from test_integration.mock_app_setup import (
 from main import app
 from src.fish import middleware
 from src.fish.db.engine import get_db
-from src.fish.db.models import DBSurvey
+from src.fish.db.models import DBSites, DBSpecies, DBSurvey
+from src.fish.operations.aggregates import refresh_species_year_summary
+from src.fish.utils.serialization import FAST_RESPONSES
 
 app.dependency_overrides[get_db] = override_get_db
 client = TestClient(app)
@@ -30,7 +35,7 @@ def build_surveys_data():
             DBSurvey(
                 id=uuid.UUID("b2cd2911-147a-402b-a6f5-776f37d8194c"),
                 survey_id="1",
-                event_date="05/07/2010",
+                event_date=datetime.date(2010, 7, 5),
                 event_date_year=2017,
                 survey_ranked_easting=1222,
                 survey_ranked_northing=135353,
@@ -41,7 +46,7 @@ def build_surveys_data():
             DBSurvey(
                 id=uuid.UUID("4dacc6b1-75a7-4eda-8584-31c55829da21"),
                 survey_id="2",
-                event_date="05/07/2010",
+                event_date=datetime.date(2010, 7, 5),
                 event_date_year=2017,
                 survey_ranked_easting=1222,
                 survey_ranked_northing=135353,
@@ -52,7 +57,7 @@ def build_surveys_data():
             DBSurvey(
                 id=uuid.UUID("4dacc6b1-75a7-4eda-8584-31c55829da22"),
                 survey_id="3",
-                event_date="05/07/2010",
+                event_date=datetime.date(2010, 7, 5),
                 event_date_year=2017,
                 survey_ranked_easting=1222,
                 survey_ranked_northing=135353,
@@ -78,7 +83,7 @@ def test_get_all_survey__200_res(mock_middleware, build_surveys_data):
             survey_ranked_northing=135353,
             species_id=1,
             area_id="01e8c83d-be5a-4e24-9039-4f4334e80a1b",
-            fish_count="5",
+            fish_count=5,
         ),
         dict(
             id="4dacc6b1-75a7-4eda-8584-31c55829da21",
@@ -89,7 +94,7 @@ def test_get_all_survey__200_res(mock_middleware, build_surveys_data):
             survey_ranked_northing=135353,
             species_id=3,
             area_id="26c5771b-e091-45e1-9284-e1583083eaad",
-            fish_count="2",
+            fish_count=2,
         ),
         dict(
             id="4dacc6b1-75a7-4eda-8584-31c55829da22",
@@ -100,7 +105,7 @@ def test_get_all_survey__200_res(mock_middleware, build_surveys_data):
             survey_ranked_northing=135353,
             species_id=2,
             area_id="4566acbc-0e40-4dd8-984f-dfec8bb39172",
-            fish_count="2",
+            fish_count=2,
         ),
     ]
 
@@ -117,7 +122,7 @@ def test_get_all_surveys__limit(mock_middleware, build_surveys_data):
             survey_ranked_northing=135353,
             species_id=1,
             area_id="01e8c83d-be5a-4e24-9039-4f4334e80a1b",
-            fish_count="5",
+            fish_count=5,
         )
     ]
 
@@ -134,7 +139,7 @@ def test_get_all_surveys__limit_skip(mock_middleware, build_surveys_data):
             survey_ranked_northing=135353,
             species_id=3,
             area_id="26c5771b-e091-45e1-9284-e1583083eaad",
-            fish_count="2",
+            fish_count=2,
         ),
     ]
 
@@ -164,7 +169,7 @@ def test_api_get_surveys_by_id__200_res(mock_middleware, build_surveys_data):
         survey_ranked_northing=135353,
         species_id=3,
         area_id="26c5771b-e091-45e1-9284-e1583083eaad",
-        fish_count="2",
+        fish_count=2,
     )
 
 
@@ -176,3 +181,214 @@ def test_api_get_surveys_by_id__no_id(mock_middleware, build_surveys_data):
 def test_api_get_surveys_fails__with_bad_params(mock_middleware, build_surveys_data):
     response = client.get("/surveys?hello=world")
     assert response.status_code == 400
+
+
+def test_get_all_surveys__fast_response_matches(
+    mocker: MockerFixture, mock_middleware, build_surveys_data
+):
+    expected = client.get("/surveys?limit=2&cursor=").json()
+    mocker.patch.object(FAST_RESPONSES, "enabled", True)
+    assert client.get("/surveys?limit=2&cursor=").json() == expected
+
+
+def test_export_surveys__ndjson(build_surveys_data):
+    response = client.get("/surveys/export")
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert "etag" not in response.headers
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["survey_id"] for row in rows] == [2, 3, 1]
+    assert rows[0]["area_id"] == "26c5771b-e091-45e1-9284-e1583083eaad"
+
+
+def test_export_surveys__csv(build_surveys_data):
+    response = client.get("/surveys/export?format=csv")
+    assert response.headers["content-type"].startswith("text/csv")
+    lines = response.text.splitlines()
+    assert lines[0] == (
+        "id,survey_id,event_date_year,survey_ranked_easting,"
+        "survey_ranked_northing,species_id,area_id,fish_count"
+    )
+    assert len(lines) == 4
+
+
+def test_export_surveys__gzip_stream(mocker, build_surveys_data):
+    mocker.patch.object(middleware.COMPRESSION, "enabled", True)
+    response = client.get("/surveys/export", headers={"accept-encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert len(response.text.splitlines()) == 3
+
+
+def test_export_surveys__bad_format(build_surveys_data):
+    response = client.get("/surveys/export?format=xml")
+    assert response.status_code == 422
+
+
+def test_batch_get_surveys(build_surveys_data):
+    missing = str(uuid.uuid4())
+    res = client.post(
+        "/surveys:batchGet",
+        json={"ids": [missing, "b2cd2911-147a-402b-a6f5-776f37d8194c"]},
+    )
+    assert [survey["survey_id"] for survey in res.json()["data"]] == [1]
+    assert res.json()["missing"] == [missing]
+
+
+@fixture
+def build_related_data(build_surveys_data):
+    with TestingSessionLocal() as session:
+        related = [
+            DBSpecies(id=1, species_name="salmon", latin_name="fishy-fish"),
+            DBSites(
+                id="01e8c83d-be5a-4e24-9039-4f4334e80a1b",
+                top_tier_site="East Hampshire",
+                site_parent_name="Hamble",
+                site_name="Frog Mill",
+                geo_water_body="GB107042016250",
+            ),
+        ]
+        populate_table(session, related)
+
+
+def test_get_all_surveys__expand(mock_middleware, build_related_data):
+    statements = []
+
+    def count_statement(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = TestingSessionLocal.kw["bind"]
+    event.listen(engine, "before_cursor_execute", count_statement)
+    try:
+        response = client.get("/surveys?expand=species,area")
+    finally:
+        event.remove(engine, "before_cursor_execute", count_statement)
+    data = response.json()["data"]
+    assert data[0]["species"] == {
+        "id": 1,
+        "species_name": "salmon",
+        "latin_name": "fishy-fish",
+    }
+    assert data[0]["area"]["site_name"] == "Frog Mill"
+    assert data[1]["species"] is None and data[1]["area"] is None
+    # the page plus one IN query per relationship, however many rows
+    assert len(statements) == 3
+
+
+def test_get_all_surveys__no_expand(mock_middleware, build_related_data):
+    data = client.get("/surveys?limit=1").json()["data"]
+    assert "species" not in data[0] and "area" not in data[0]
+
+
+def test_get_all_surveys__bad_expand(mock_middleware, build_surveys_data):
+    response = client.get("/surveys?expand=species,weather")
+    assert response.status_code == 400
+
+
+def test_get_all_surveys__filters(mock_middleware, build_surveys_data):
+    response = client.get("/surveys?species_id=2&year_from=2017&year_to=2017")
+    body = response.json()
+    assert [survey["survey_id"] for survey in body["data"]] == [3]
+    assert body["total_count"] == 1
+
+
+def test_get_all_surveys__bounding_box(mock_middleware, build_surveys_data):
+    response = client.get(
+        "/surveys?min_easting=1000&max_easting=2000&min_northing=0&max_northing=100"
+    )
+    assert response.json()["data"] == []
+    assert response.json()["total_count"] == 0
+
+
+def test_get_all_surveys__filter_next_url(mock_middleware, build_surveys_data):
+    response = client.get("/surveys?year_from=2017&limit=1")
+    body = response.json()
+    assert body["total_count"] == 3
+    assert "year_from=2017" in body["next_url"]
+
+
+def test_get_all_surveys__filtered_fast_response(mock_middleware, build_surveys_data):
+    FAST_RESPONSES.enabled = True
+    try:
+        response = client.get("/surveys?area_id=26c5771b-e091-45e1-9284-e1583083eaad")
+    finally:
+        FAST_RESPONSES.enabled = False
+    assert [survey["survey_id"] for survey in response.json()["data"]] == [2]
+    assert response.json()["total_count"] == 1
+
+
+@fixture
+def build_hex_area_survey():
+    survey_id = uuid.UUID("c3cd2911-147a-402b-a6f5-776f37d8194c")
+    with TestingSessionLocal() as session:
+        populate_table(
+            session,
+            [
+                DBSurvey(
+                    id=survey_id,
+                    survey_id=7,
+                    event_date_year=2017,
+                    survey_ranked_easting=1222,
+                    survey_ranked_northing=135353,
+                    species_id=1,
+                    area_id="00005d07e9f912b0838cc1407d4bb709",
+                    fish_count=5,
+                )
+            ],
+        )
+    yield
+    with TestingSessionLocal() as session:
+        session.execute(delete(DBSurvey).where(DBSurvey.id == survey_id))
+        session.commit()
+
+
+def test_get_all_surveys__area_filter_dashed_id_for_hex_area(
+    mock_middleware, build_hex_area_survey
+):
+    response = client.get("/surveys?area_id=00005d07-e9f9-12b0-838c-c1407d4bb709")
+    assert [survey["survey_id"] for survey in response.json()["data"]] == [7]
+    assert response.json()["total_count"] == 1
+
+
+def test_get_surveys_near__bad_radius(mock_middleware):
+    response = client.get("/surveys/near?easting=1&northing=2&radius=0")
+    assert response.status_code == 422
+    response = client.get("/surveys/near?easting=1&northing=2&radius=50001")
+    assert response.status_code == 422
+
+
+def test_get_nearest_surveys__bad_k(mock_middleware):
+    response = client.get("/surveys/nearest?easting=1&northing=2&k=101")
+    assert response.status_code == 422
+
+
+@fixture
+def build_year_summary(build_related_data):
+    with TestingSessionLocal() as session:
+        refresh_species_year_summary(session)
+
+
+def test_get_yearly_counts(mock_middleware, build_year_summary):
+    response = client.get("/surveys/yearly?year_from=2017")
+    assert response.json() == [
+        {"species_id": 1, "event_date_year": 2017, "total_count": 5, "survey_count": 1},
+        {"species_id": 2, "event_date_year": 2017, "total_count": 2, "survey_count": 1},
+        {"species_id": 3, "event_date_year": 2017, "total_count": 2, "survey_count": 1},
+    ]
+
+
+def test_get_yearly_counts__by_water_body(mock_middleware, build_year_summary):
+    response = client.get("/surveys/yearly?species_id=1&by=water_body")
+    assert response.json() == [
+        {
+            "species_id": 1,
+            "event_date_year": 2017,
+            "geo_water_body": "GB107042016250",
+            "total_count": 5,
+            "survey_count": 1,
+        }
+    ]
+
+
+def test_get_yearly_counts__by_site_needs_species(mock_middleware, build_year_summary):
+    response = client.get("/surveys/yearly?by=site")
+    assert response.status_code == 400
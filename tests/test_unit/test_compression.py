@@ -0,0 +1,68 @@
+import asyncio
+import gzip
+import zlib
+
+import pytest
+
+from src.fish.utils import compression
+
+
+@pytest.fixture
+def gzip_only(mocker):
+    mocker.patch.object(compression, "brotli", None)
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    (
+        (None, None),
+        ("", None),
+        ("gzip", "gzip"),
+        ("gzip, deflate", "gzip"),
+        ("deflate", None),
+        ("gzip;q=0", None),
+        ("*", "gzip"),
+        ("*, gzip;q=0", None),
+        ("GZIP;q=0.5", "gzip"),
+        ("gzip;q=nonsense", None),
+    ),
+)
+def test_negotiate_encoding__gzip_only(gzip_only, header, expected):
+    assert compression.negotiate_encoding(header) == expected
+
+
+def test_negotiate_encoding__prefers_brotli(mocker):
+    mocker.patch.object(compression, "brotli", object())
+    assert compression.negotiate_encoding("gzip, br") == "br"
+    assert compression.negotiate_encoding("gzip, br;q=0.5") == "gzip"
+    assert compression.negotiate_encoding("br;q=0, *") == "gzip"
+
+
+def test_compress__gzip_is_deterministic():
+    body = b'{"id":"01e8c83d-be5a-4e24-9039-4f4334e80a1c"}' * 100
+    compressed = compression.compress(body, "gzip")
+    assert compressed == compression.compress(body, "gzip")
+    assert gzip.decompress(compressed) == body
+    assert len(compressed) < len(body) / 5
+
+
+def test_compress__brotli():
+    brotli = pytest.importorskip("brotli")
+    body = b'{"id":"01e8c83d-be5a-4e24-9039-4f4334e80a1c"}' * 100
+    assert brotli.decompress(compression.compress(body, "br")) == body
+
+
+async def iterate(chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+async def read_stream(stream):
+    return b"".join([chunk async for chunk in stream])
+
+
+def test_compress_stream__gzip():
+    chunks = [b'{"id":%d}\n' % i for i in range(1000)]
+    stream = compression.compress_stream(iterate(chunks), "gzip")
+    compressed = asyncio.run(read_stream(stream))
+    assert zlib.decompress(compressed, 31) == b"".join(chunks)
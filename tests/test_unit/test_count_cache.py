@@ -0,0 +1,37 @@
+from pytest_mock import MockerFixture
+
+from src.fish.db.models import DBSites, DBSpecies
+from src.fish.utils.count_cache import ModelCountCache
+
+
+def test_get__caches_count(mocker: MockerFixture):
+    load = mocker.Mock(return_value=10)
+    cache = ModelCountCache(ttl=60)
+    assert cache.get(DBSpecies, load) == 10
+    assert cache.get(DBSpecies, load) == 10
+    load.assert_called_once()
+
+
+def test_get__expired_count(mocker: MockerFixture):
+    load = mocker.Mock(side_effect=[10, 11])
+    cache = ModelCountCache(ttl=60)
+    mocker.patch("time.monotonic", return_value=0)
+    cache.get(DBSpecies, load)
+    mocker.patch("time.monotonic", return_value=61)
+    assert cache.get(DBSpecies, load) == 11
+
+
+def test_get__no_ttl_skips_cache(mocker: MockerFixture):
+    load = mocker.Mock(side_effect=[10, 11])
+    cache = ModelCountCache(ttl=0)
+    cache.get(DBSpecies, load)
+    assert cache.get(DBSpecies, load) == 11
+
+
+def test_invalidate__model():
+    cache = ModelCountCache(ttl=60)
+    cache.get(DBSpecies, lambda: 10)
+    cache.get(DBSites, lambda: 20)
+    cache.invalidate(DBSpecies)
+    assert cache.get(DBSpecies, lambda: 11) == 11
+    assert cache.get(DBSites, lambda: 21) == 20
@@ -0,0 +1,52 @@
+from sqlalchemy import create_engine
+
+from src.fish.db import engine
+from src.fish.db.pool import TimedQueuePool
+
+
+def test_build_pool_kwargs__defaults():
+    assert engine.build_pool_kwargs({}) == dict(
+        pool_size=5,
+        max_overflow=10,
+        pool_timeout=30.0,
+        pool_recycle=-1,
+        pool_pre_ping=False,
+    )
+
+
+def test_build_pool_kwargs__from_env():
+    creds = {
+        "PGPOOL_SIZE": "20",
+        "PGPOOL_MAX_OVERFLOW": "0",
+        "PGPOOL_TIMEOUT": "2.5",
+        "PGPOOL_RECYCLE": "1800",
+        "PGPOOL_PRE_PING": "true",
+    }
+    assert engine.build_pool_kwargs(creds) == dict(
+        pool_size=20,
+        max_overflow=0,
+        pool_timeout=2.5,
+        pool_recycle=1800,
+        pool_pre_ping=True,
+    )
+
+
+def test_build_connect_args__no_statement_timeout():
+    assert engine.build_connect_args({}) == {}
+
+
+def test_build_connect_args__statement_timeout():
+    creds = {"PGSTATEMENT_TIMEOUT": "5000"}
+    assert engine.build_connect_args(creds) == {"options": "-c statement_timeout=5000"}
+    assert engine.build_connect_args(creds, is_async=True) == {
+        "server_settings": {"statement_timeout": "5000"}
+    }
+
+
+def test_get_pool_statuses__bound_engines_only(mocker):
+    sync_engine = create_engine("sqlite://", poolclass=TimedQueuePool)
+    mocker.patch.dict(engine.DBSession.kw, {"bind": sync_engine})
+    mocker.patch.dict(engine.AsyncDBSession.kw, {"bind": None})
+    statuses = engine.get_pool_statuses()
+    assert list(statuses) == ["sync"]
+    assert statuses["sync"]["wait"]["checkouts"] == 0
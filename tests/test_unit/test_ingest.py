@@ -0,0 +1,85 @@
+import io
+from pathlib import Path
+
+import pytest
+
+from src.fish.db import ingest
+
+
+def test_iter_csv_batches__reorders_and_batches():
+    file = io.StringIO(
+        "latin_name,id,species_name\nSalmo,1,salmon\n,2,trout\n,3,pike\n"
+    )
+    batches = list(
+        ingest.iter_csv_batches(file, ["id", "species_name", "latin_name"], 2)
+    )
+    assert [(buffer.read(), rows, ragged) for buffer, rows, ragged in batches] == [
+        ("1,salmon,Salmo\r\n2,trout,\r\n", 2, 0),
+        ("3,pike,\r\n", 1, 0),
+    ]
+
+
+def test_iter_csv_batches__ragged_rows():
+    file = io.StringIO("id,species_name,latin_name\n1,salmon\n2,trout,\n")
+    batches = list(
+        ingest.iter_csv_batches(file, ["id", "species_name", "latin_name"], 10)
+    )
+    assert [(rows, ragged) for _, rows, ragged in batches] == [(1, 1)]
+
+
+def test_iter_csv_batches__bad_header():
+    file = io.StringIO("id,name\n1,salmon\n")
+    with pytest.raises(ValueError):
+        list(ingest.iter_csv_batches(file, ["id", "species_name", "latin_name"], 10))
+
+
+@pytest.mark.parametrize(
+    "table, path", (("sites", "fish_sites.csv"), ("species", "species_table.csv"))
+)
+def test_iter_csv_batches__seed_files(table, path):
+    seed = Path(__file__).parents[2] / "database" / "sql" / "data" / path
+    columns = [name for name, _ in ingest.TABLE_SPECS[table].columns]
+    with open(seed, newline="") as file:
+        batches = list(ingest.iter_csv_batches(file, columns, 1000))
+    with open(seed, newline="") as file:
+        records = sum(1 for _ in ingest.csv.reader(file)) - 1
+    assert sum(rows + ragged for _, rows, ragged in batches) == records
+    assert sum(rows for _, rows, _ in batches) > 0
+
+
+def test_iter_csv_batches__header_alias():
+    file = io.StringIO("id,geo_waterbody\nfoo,GB107042016250\n")
+    ((buffer, rows, _),) = ingest.iter_csv_batches(file, ["geo_water_body", "id"], 10)
+    assert buffer.read() == "GB107042016250,foo\r\n"
+
+
+def test_build_upsert_sql():
+    sql = ingest.build_upsert_sql(ingest.TABLE_SPECS["surveys"])
+    assert "INSERT INTO fish_survey (id, survey_id, event_date" in sql
+    assert "DISTINCT ON (trim(id)::uuid)" in sql
+    assert "nullif(trim(fish_count), '')::integer" in sql
+    assert "ON CONFLICT (id) DO UPDATE SET survey_id = excluded.survey_id" in sql
+    assert "id = excluded.id" not in sql.replace("survey_id = excluded.survey_id", "")
+
+
+def test_format_report():
+    report = ingest.IngestReport("fish_species", 1000, 900, 50, 50, 2.0)
+    assert ingest.format_report(report) == (
+        "fish_species: read 1000 rows in 2.0s (500 rows/s), "
+        "inserted 900, updated 50, rejected 50"
+    )
+
+
+def test_invalidate_api_caches(mocker):
+    urlopen = mocker.patch.object(ingest.urllib.request, "urlopen")
+    ingest.invalidate_api_caches("http://localhost:8000/", "secret")
+    request = urlopen.call_args.args[0]
+    assert request.full_url == "http://localhost:8000/internal/cache/invalidate"
+    assert request.method == "POST"
+    assert request.get_header("X-internal-token") == "secret"
+
+
+def test_build_affected_keys_sql():
+    sql = ingest.build_affected_keys_sql(ingest.TABLE_SPECS["surveys"])
+    assert "SELECT area_id, nullif(trim(species_id), '')::integer" in sql
+    assert "SELECT area_id, species_id FROM fish_survey WHERE id IN" in sql
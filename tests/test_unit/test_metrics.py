@@ -0,0 +1,65 @@
+from sqlalchemy import create_engine, text
+
+from src.fish.db.pool import TimedQueuePool, get_pool_status
+from src.fish.utils import metrics
+
+
+def test_histogram_render__cumulative():
+    histogram = metrics.Histogram("fish_test", "help.", ("route",), (0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5, "/a")
+    assert histogram.render() == [
+        "# HELP fish_test help.",
+        "# TYPE fish_test histogram",
+        'fish_test_bucket{route="/a",le="0.1"} 1',
+        'fish_test_bucket{route="/a",le="1.0"} 2',
+        'fish_test_bucket{route="/a",le="+Inf"} 3',
+        'fish_test_sum{route="/a"} 5.55',
+        'fish_test_count{route="/a"} 3',
+    ]
+
+
+def test_histogram_observe__bucket_bound_is_inclusive():
+    histogram = metrics.Histogram("fish_test", "help.", buckets=(0, 1))
+    histogram.observe(0)
+    assert 'fish_test_bucket{le="0"} 1' in histogram.render()
+
+
+def test_format_labels__escapes():
+    assert metrics.format_labels([("route", 'a"b\\')]) == '{route="a\\"b\\\\"}'
+
+
+def test_instrument_engine__counts_request_queries():
+    engine = create_engine("sqlite://", poolclass=TimedQueuePool)
+    metrics.instrument_engine(engine)
+    metrics.instrument_engine(engine)
+    stats = metrics.RequestStats()
+    token = metrics.REQUEST_STATS.set(stats)
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+    finally:
+        metrics.REQUEST_STATS.reset(token)
+    assert stats.queries == 2
+    assert stats.db_seconds > 0
+    assert stats.pool_wait > 0
+
+
+def test_instrument_engine__outside_a_request():
+    engine = create_engine("sqlite://")
+    metrics.instrument_engine(engine)
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT 1")).scalar() == 1
+
+
+def test_render_pool_metrics():
+    pool = create_engine("sqlite://", poolclass=TimedQueuePool).pool
+    pool.connect().close()
+    lines = metrics.render_pool_metrics(
+        {"sync": get_pool_status(pool), "untimed": {"size": 5}}
+    )
+    assert 'fish_db_pool_checkouts_total{pool="sync"} 1' in lines
+    assert 'fish_db_pool_checked_out{pool="sync"} 0' in lines
+    assert not any("untimed" in line for line in lines)
@@ -1,3 +1,5 @@
+import json
+
 import pytest
 from starlette.datastructures import URL
 
@@ -73,3 +75,77 @@ def test_check_for_bad_params__bad_params():
         {"limit": 10, "skip": 10, "where": 1}, {"limit", "skip"}
     )
     assert result.status_code == 400
+
+
+def test_build_next_cursor_url__existing_params():
+    assert (
+        middleware.build_next_cursor_url(
+            URL("http://127.0.0.1:8000/sites?limit=10&cursor="), "MTA", 10
+        )
+        == "http://127.0.0.1:8000/sites?cursor=MTA&limit=10"
+    )
+
+
+def test_build_envelope():
+    body = middleware.build_envelope(b'[{"id":1}]', total_count=1, next_url=None)
+    assert json.loads(body) == {"total_count": 1, "next_url": None, "data": [{"id": 1}]}
+
+
+def test_validate_cursor_and_limit__with_skip():
+    result = middleware.validate_cursor_and_limit({"cursor": "", "skip": "10"})
+    assert result.status_code == 400
+
+
+@pytest.mark.parametrize("path", ("/sites", "/species", "/surveys"))
+def test_retrieve_query_expected_params__cursor(path):
+    assert {"limit", "skip", "cursor"} <= middleware.retrieve_query_expected_params(
+        path
+    )
+
+
+def test_retrieve_query_expected_params__extra_params():
+    assert "expand" in middleware.retrieve_query_expected_params("/surveys")
+    assert "expand" not in middleware.retrieve_query_expected_params("/sites")
+
+
+def test_configure_count_cache():
+    middleware.configure_count_cache(
+        {"COUNT_CACHE_TTL": "5", "COUNT_ESTIMATED": "True"}
+    )
+    assert middleware.COUNT_CACHE.ttl == 5
+    assert middleware.COUNT_CACHE.estimated
+    middleware.configure_count_cache({})
+    assert middleware.COUNT_CACHE.ttl == 60
+    assert not middleware.COUNT_CACHE.estimated
+
+
+def test_build_etag():
+    etag = middleware.build_etag(b'{"id":1}')
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == middleware.build_etag(b'{"id":1}')
+    assert etag != middleware.build_etag(b'{"id":2}')
+
+
+@pytest.mark.parametrize(
+    "if_none_match, matches",
+    (
+        ('"abc"', True),
+        ('W/"abc"', True),
+        ('"xyz", "abc"', True),
+        ("*", True),
+        ('"xyz"', False),
+    ),
+)
+def test_etag_matches(if_none_match, matches):
+    assert middleware.etag_matches(if_none_match, '"abc"') is matches
+
+
+def test_get_cache_control():
+    assert middleware.get_cache_control("/species/1") == "public, max-age=3600"
+    assert middleware.get_cache_control("/") == middleware.DEFAULT_CACHE_CONTROL
+
+
+def test_configure_cache_control(mocker):
+    mocker.patch.dict(middleware.CACHE_CONTROL)
+    middleware.configure_cache_control({"CACHE_CONTROL_SURVEYS": "no-store"})
+    assert middleware.get_cache_control("/surveys") == "no-store"
@@ -0,0 +1,77 @@
+import asyncio
+
+from pytest_mock import MockerFixture
+
+from src.fish.operations import species
+from src.fish.utils import operation_cache
+from src.fish.utils.operation_cache import MISSING, LRUCache
+
+
+def test_get__miss_then_hit():
+    cache = LRUCache(maxsize=2)
+    assert cache.get("a") is MISSING
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_set__evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_get__expired(mocker: MockerFixture):
+    cache = LRUCache(maxsize=2, ttl=10)
+    mocker.patch("time.monotonic", return_value=0)
+    cache.set("a", 1)
+    mocker.patch("time.monotonic", return_value=10)
+    assert cache.get("a") is MISSING
+
+
+def test_set__disabled():
+    cache = LRUCache(maxsize=0)
+    cache.set("a", 1)
+    assert cache.get("a") is MISSING
+
+
+def test_cached_operation__skips_db_arg(mocker: MockerFixture):
+    mocker.patch.object(operation_cache, "OPERATION_CACHE", LRUCache(maxsize=10))
+    operation = mocker.Mock(return_value=1, __qualname__="operation")
+    cached = operation_cache.cached_operation(operation)
+    assert cached("db one", 1) == 1
+    assert cached("db two", 1) == 1
+    operation.assert_called_once_with("db one", 1)
+
+
+def test_cached_operation__async(mocker: MockerFixture):
+    mocker.patch.object(operation_cache, "OPERATION_CACHE", LRUCache(maxsize=10))
+    calls = []
+
+    async def operation(db, id):
+        calls.append(id)
+        return id
+
+    cached = operation_cache.cached_operation(operation)
+    assert asyncio.run(cached("db", 1)) == 1
+    assert asyncio.run(cached("db", 1)) == 1
+    assert calls == [1]
+
+
+def test_get_all_species_fast__fresh_response_per_call(mocker: MockerFixture):
+    mocker.patch.object(operation_cache, "OPERATION_CACHE", LRUCache(maxsize=10))
+    rows = [(1, "salmon", "fishy-fish")]
+    get_page_rows = mocker.patch.object(species, "get_page_rows", return_value=rows)
+    first = species.get_all_species_fast(None, 10, 0)
+    first.headers["x-leak"] = "1"
+    second = species.get_all_species_fast(None, 10, 0)
+    assert first is not second
+    assert "x-leak" not in second.headers
+    assert first.body == second.body
+    get_page_rows.assert_called_once()
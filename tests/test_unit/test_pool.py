@@ -0,0 +1,29 @@
+import pytest
+from sqlalchemy import create_engine, exc
+
+from src.fish.db.pool import TimedQueuePool, get_pool_status
+
+
+@pytest.fixture
+def engine():
+    return create_engine(
+        "sqlite://", poolclass=TimedQueuePool, pool_size=1, max_overflow=0
+    )
+
+
+def test_get_pool_status__checked_out(engine):
+    with engine.connect():
+        status = get_pool_status(engine.pool)
+    assert status["checked_out"] == 1
+    assert status["overflow"] == 0
+    assert status["wait"]["checkouts"] == 1
+
+
+def test_timed_queue_pool__records_timeouts(engine):
+    engine.pool._timeout = 0.01
+    with engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+    wait = get_pool_status(engine.pool)["wait"]
+    assert wait["timeouts"] == 1
+    assert wait["max_wait_seconds"] >= 0.01
@@ -1,8 +1,11 @@
+import uuid
+from types import SimpleNamespace
+
 import pytest
-from fastapi import HTTPException
+from fastapi import HTTPException, Response
 from pytest_mock import MockerFixture
 
-from src.fish.db.models import DBSpecies
+from src.fish.db.models import DBSites, DBSpecies, DBSurvey
 from src.fish.operations.output_models import SpeciesResult
 from src.fish.utils import query_builder
 
@@ -34,3 +37,97 @@ def test_get_item_by_id__no_id(mocker: MockerFixture):
     mocker.patch.object(query_builder, "get_by_id", return_value=None)
     with pytest.raises(HTTPException):
         query_builder.get_item_by_id("foo", 1, DBSpecies, SpeciesResult)
+
+
+@pytest.mark.parametrize(
+    "model, id",
+    (
+        (DBSpecies, 1020),
+        (DBSites, "00005d07e9f912b0838cc1407d4bb709"),
+        (DBSurvey, uuid.UUID("b2cd2911-147a-402b-a6f5-776f37d8194c")),
+    ),
+)
+def test_decode_cursor__round_trip(model, id):
+    cursor = query_builder.encode_cursor(id)
+    assert query_builder.decode_cursor(cursor, model) == id
+
+
+def test_decode_cursor__site_uuid_is_stored_form():
+    # SiteResult hands back a UUID, the cursor must hold the stored hex
+    cursor = query_builder.encode_cursor(uuid.UUID("00005d07e9f912b0838cc1407d4bb709"))
+    assert query_builder.decode_cursor(cursor, DBSites) == (
+        "00005d07e9f912b0838cc1407d4bb709"
+    )
+
+
+def test_decode_cursor__empty_cursor():
+    assert query_builder.decode_cursor("", DBSpecies) is None
+
+
+def test_decode_cursor__bad_cursor():
+    with pytest.raises(HTTPException) as e:
+        query_builder.decode_cursor(query_builder.encode_cursor("foo"), DBSpecies)
+    assert e.value.status_code == 400
+
+
+def test_set_next_cursor__full_page():
+    response = Response()
+    rows = [
+        SpeciesResult(id=id, species_name="salmon", latin_name=None) for id in (1, 10)
+    ]
+    query_builder.set_next_cursor(response, rows, 2, "")
+    assert response.headers[query_builder.NEXT_CURSOR_HEADER] == "MTA"
+
+
+@pytest.mark.parametrize("limit, cursor", ((2, None), (3, "")))
+def test_set_next_cursor__no_next_page(limit, cursor):
+    response = Response()
+    rows = [
+        SpeciesResult(id=id, species_name="salmon", latin_name=None) for id in (1, 10)
+    ]
+    query_builder.set_next_cursor(response, rows, limit, cursor)
+    assert query_builder.NEXT_CURSOR_HEADER not in response.headers
+
+
+def test_result_model_columns():
+    columns = query_builder.result_model_columns(DBSpecies, SpeciesResult)
+    assert [column.name for column in columns] == ["id", "species_name", "latin_name"]
+
+
+def test_get_item_by_id__from_row(mocker: MockerFixture):
+    row = mocker.Mock(id=1, species_name="salmon", latin_name=None)
+    get_by_id = mocker.patch.object(query_builder, "get_by_id", return_value=row)
+    assert query_builder.get_item_by_id(
+        "foo", 1, DBSpecies, SpeciesResult
+    ) == SpeciesResult(id=1, species_name="salmon", latin_name=None)
+    columns = get_by_id.call_args.args[3]
+    assert [column.name for column in columns] == ["id", "species_name", "latin_name"]
+
+
+def test_order_batch_results():
+    rows = [
+        SimpleNamespace(id=2, species_name="trout", latin_name=None),
+        SimpleNamespace(id=1, species_name="salmon", latin_name=None),
+    ]
+    data, missing = query_builder.order_batch_results([1, 5, 2, 5], rows, SpeciesResult)
+    assert [species.id for species in data] == [1, 2]
+    assert missing == [5]
+
+
+@pytest.mark.parametrize(
+    "id, expected",
+    (
+        (
+            "00005d07-e9f9-12b0-838c-c1407d4bb709",
+            (
+                "00005d07-e9f9-12b0-838c-c1407d4bb709",
+                "00005d07e9f912b0838cc1407d4bb709",
+            ),
+        ),
+        ("00005d07e9f912b0838cc1407d4bb709", ("00005d07e9f912b0838cc1407d4bb709",)),
+        ("missing-site", ("missing-site",)),
+        (1020, (1020,)),
+    ),
+)
+def test_stored_id_forms(id, expected):
+    assert query_builder.stored_id_forms(id) == expected
@@ -0,0 +1,82 @@
+import logging
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import Session
+
+from src.fish.db.models import Base, DBSpecies, DBSurvey
+from src.fish.utils import metrics, query_log
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    metrics.instrument_engine(engine)
+    query_log.instrument_query_log(engine)
+    return engine
+
+
+@pytest.fixture
+def request_stats():
+    stats = metrics.RequestStats()
+    token = metrics.REQUEST_STATS.set(stats)
+    yield stats
+    metrics.REQUEST_STATS.reset(token)
+
+
+@pytest.mark.parametrize(
+    "parameters, many, expected",
+    (
+        ({"id_1": 1, "name": "salmon"}, False, "id_1: int, name: str"),
+        ((1, None), False, "int, NoneType"),
+        ((), False, ""),
+        ([(1,), (2,)], True, "2 x (int)"),
+    ),
+)
+def test_describe_binds(parameters, many, expected):
+    assert query_log.describe_binds(parameters, many) == expected
+
+
+def test_log_slow_query__with_plan(mocker, caplog, engine):
+    mocker.patch.object(query_log.QUERY_LOG, "slow_query_ms", 1e-9)
+    mocker.patch.object(query_log.QUERY_LOG, "explain", True)
+    with caplog.at_level(logging.WARNING, logger=query_log.__name__):
+        with engine.connect() as conn:
+            conn.execute(select(DBSpecies).filter(DBSpecies.id == 1)).all()
+    message = caplog.records[-1].getMessage()
+    assert "slow query" in message
+    assert "binds: int" in message
+    assert "SEARCH fish_species USING INTEGER PRIMARY KEY" in message
+
+
+def test_log_slow_query__under_threshold(mocker, caplog, engine):
+    mocker.patch.object(query_log.QUERY_LOG, "slow_query_ms", 60_000)
+    with caplog.at_level(logging.WARNING, logger=query_log.__name__):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    assert not caplog.records
+
+
+def test_check_query_budget__flags_lazy_loads(mocker, caplog, engine, request_stats):
+    mocker.patch.object(query_log.QUERY_LOG, "budget", 2)
+    with Session(engine) as session:
+        session.add_all(
+            [DBSpecies(id=i, species_name=f"species {i}") for i in range(1, 4)]
+            + [
+                DBSurvey(id=uuid.uuid4(), survey_id=i, species_id=i)
+                for i in range(1, 4)
+            ]
+        )
+        session.commit()
+        request_stats.queries = 0
+        # the N+1: one query for the surveys, then one per lazy species
+        for survey in session.scalars(select(DBSurvey)):
+            survey.species.species_name
+    with caplog.at_level(logging.WARNING, logger=query_log.__name__):
+        query_log.check_query_budget("GET", "/surveys", request_stats)
+    assert request_stats.queries == 4
+    assert caplog.records[-1].getMessage() == (
+        "GET /surveys ran 4 queries, over the budget of 2"
+    )
@@ -0,0 +1,35 @@
+from sqlalchemy.dialects import postgresql
+
+from src.fish.db.models import SITE_SEARCH_TEXT, DBSites
+from src.fish.operations.output_models import SiteResult
+from src.fish.utils import query_builder
+from src.fish.utils.query_builder import build_search_statement
+
+
+def test_build_search_statement():
+    statement = build_search_statement(DBSites, SiteResult, SITE_SEARCH_TEXT, "ham", 5)
+    sql = str(
+        statement.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+    expression = (
+        "(coalesce(fish_sites.site_name, '') || ' ' || "
+        "coalesce(fish_sites.site_parent_name, '') || ' ' || "
+        "coalesce(fish_sites.top_tier_site, ''))"
+    )
+    assert f"{expression} ILIKE '%%ham%%' ESCAPE '/'" in sql
+    assert f"{expression} %%> 'ham'" in sql
+    assert f"word_similarity('ham', {expression}) AS score" in sql
+    assert "ORDER BY score DESC, fish_sites.id" in sql
+    assert "LIMIT 5" in sql
+
+
+def test_build_search_statement__escapes_wildcards():
+    statement = build_search_statement(DBSites, SiteResult, SITE_SEARCH_TEXT, "5%_", 5)
+    params = statement.compile(dialect=postgresql.dialect()).params
+    assert "%5/%/_%" in params.values()
+
+
+def test_escape_like():
+    assert query_builder.escape_like("a/b%c_") == "a//b/%c/_"
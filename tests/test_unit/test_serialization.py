@@ -0,0 +1,55 @@
+import json
+import uuid
+
+from src.fish.db.models import DBSites
+from src.fish.operations.output_models import SiteResult
+from src.fish.utils import serialization
+
+
+def test_build_row_converters__uuid_from_string():
+    converters = serialization.build_row_converters(DBSites, SiteResult)
+    assert converters[0] == ("id", uuid.UUID)
+    assert all(convert is None for _, convert in converters[1:])
+
+
+def test_rows_to_json():
+    converters = serialization.build_row_converters(DBSites, SiteResult)
+    rows = [
+        ("00005d07e9f912b0838cc1407d4bb709", "East Hampshire", "Hamble", "Mill", None)
+    ]
+    assert json.loads(serialization.rows_to_json(rows, converters)) == [
+        {
+            "id": "00005d07-e9f9-12b0-838c-c1407d4bb709",
+            "top_tier_site": "East Hampshire",
+            "site_parent_name": "Hamble",
+            "site_name": "Mill",
+            "geo_water_body": None,
+        }
+    ]
+
+
+def test_fast_response_settings__configure():
+    settings = serialization.FastResponseSettings()
+    settings.configure({"FAST_RESPONSES": "true"})
+    assert settings.enabled
+
+
+def test_rows_to_ndjson():
+    converters = serialization.build_row_converters(DBSites, SiteResult)
+    rows = [
+        ("00005d07e9f912b0838cc1407d4bb709", "East Hampshire", "Hamble", "Mill", None),
+        ("00005d07e9f912b0838cc1407d4bb708", "East Hampshire", "Hamble", "Weir", None),
+    ]
+    lines = serialization.rows_to_ndjson(rows, converters).splitlines()
+    assert [json.loads(line)["site_name"] for line in lines] == ["Mill", "Weir"]
+
+
+def test_rows_to_csv():
+    converters = serialization.build_row_converters(DBSites, SiteResult)
+    rows = [
+        ("00005d07e9f912b0838cc1407d4bb709", "East, Hampshire", "Hamble", "Mill", None)
+    ]
+    assert serialization.rows_to_csv(rows, converters, header=True) == (
+        b"id,top_tier_site,site_parent_name,site_name,geo_water_body\n"
+        b'00005d07-e9f9-12b0-838c-c1407d4bb709,"East, Hampshire",Hamble,Mill,\n'
+    )
@@ -0,0 +1,37 @@
+from sqlalchemy import Select
+from sqlalchemy.dialects import postgresql
+
+from src.fish.operations.sites import sites_within_radius_query_builder
+from src.fish.operations.surveys import (
+    nearest_surveys_query_builder,
+    surveys_within_radius_query_builder,
+)
+
+
+def compile_postgres(statement: Select) -> str:
+    return str(
+        statement.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+
+
+def test_surveys_within_radius_query_builder():
+    sql = compile_postgres(surveys_within_radius_query_builder(450000, 120000, 500, 10))
+    assert (
+        "ST_DWithin(fish_survey.geom, ST_SetSRID(ST_MakePoint(450000, 120000), 27700), 500)"
+        in sql
+    )
+    assert "ORDER BY distance" in sql
+
+
+def test_nearest_surveys_query_builder():
+    sql = compile_postgres(nearest_surveys_query_builder(450000, 120000, 5))
+    assert "fish_survey.geom <-> ST_SetSRID(ST_MakePoint(450000, 120000), 27700)" in sql
+    assert "LIMIT 5" in sql
+
+
+def test_sites_within_radius_query_builder():
+    sql = compile_postgres(sites_within_radius_query_builder(450000, 120000, 500, 10))
+    assert "GROUP BY fish_survey.area_id" in sql
+    assert "ON anon_1.area_id = fish_sites.id" in sql